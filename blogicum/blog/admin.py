@@ -1,6 +1,79 @@
+import re
+from datetime import date, datetime, time, timedelta
+
 from django.contrib import admin
+from django.db import models
+from django.utils import timezone
+from django.utils.html import format_html
+
+from .forms import ImageHeaderField
+from .images import ADMIN_PREVIEW_WIDTH
+from .models import (Category, Comment, CommentStatus, ImageJob, Location,
+                     Post)
+from .paginators import CachedCountPaginator
+from .search import filter_posts
+from .spam import set_comment_status
+
+DATE_RE = re.compile(r'^(\d{4})-(\d{2})(?:-(\d{2}))?$')
+
+
+def parse_date_range(value):
+    """Полуинтервал [начало, конец) для «ГГГГ-ММ» или «ГГГГ-ММ-ДД»."""
+    match = DATE_RE.match(value)
+    if match is None:
+        return None
+    year, month, day = match.groups()
+    try:
+        start = date(int(year), int(month), int(day or 1))
+    except ValueError:
+        return None
+    if day:
+        end = start + timedelta(days=1)
+    else:
+        end = (start + timedelta(days=31)).replace(day=1)
+    return tuple(
+        timezone.make_aware(datetime.combine(value, time.min))
+        for value in (start, end)
+    )
+
+
+class LargeTableAdminMixin:
+    """Поиск и подсчёт в админке больших таблиц.
+
+    Слова вида @имя ищут автора по началу username, даты «ГГГГ-ММ-ДД»,
+    «ГГГГ-ММ» и диапазоны «начало..конец» — по date_field, остальные
+    слова передаются в search_text(). Число записей берётся из кеша,
+    а полный счёт без фильтров не выполняется.
+    """
+
+    date_field = None
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+
+    def search_text(self, queryset, text):
+        return queryset
 
-from .models import Category, Comment, Location, Post
+    def get_search_results(self, request, queryset, search_term):
+        words = []
+        for term in search_term.split():
+            if term.startswith('@') and len(term) > 1:
+                username = term[1:]
+                queryset = queryset.filter(
+                    author__username__gte=username,
+                    author__username__lt=username + '\U0010ffff',
+                )
+                continue
+            bounds = [parse_date_range(part) for part in term.split('..', 1)]
+            if all(bounds):
+                queryset = queryset.filter(**{
+                    f'{self.date_field}__gte': bounds[0][0],
+                    f'{self.date_field}__lt': bounds[-1][1],
+                })
+                continue
+            words.append(term)
+        if words:
+            queryset = self.search_text(queryset, ' '.join(words))
+        return queryset, False
 
 
 @admin.register(Category)
@@ -18,12 +91,65 @@ class LocationAdmin(admin.ModelAdmin):
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
-    search_fields = ['title', 'author']
-    list_filter = ('created_at', 'author')
-    list_display = ['title', 'author']
+class PostAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    search_fields = ['title']
+    date_field = 'pub_date'
+    list_filter = ('is_published', 'category')
+    list_display = ['title', 'author', 'comment_count', 'image_preview']
+    list_select_related = ('author',)
+    autocomplete_fields = ['author', 'category', 'location']
+    readonly_fields = ['image_preview']
+    formfield_overrides = {
+        models.ImageField: {'form_class': ImageHeaderField},
+    }
+
+    def search_text(self, queryset, text):
+        return filter_posts(queryset, text)
+
+    @admin.display(description='Превью фото')
+    def image_preview(self, post):
+        if not post.image:
+            return '—'
+        return format_html(
+            '<img src="{}" style="max-width: {}px" loading="lazy">',
+            post.image_preview_url, ADMIN_PREVIEW_WIDTH
+        )
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
-    search_fields = ['author', 'created_at']
+class CommentAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Комментарии и очередь модерации.
+
+    Очередь — фильтр «На модерации»; состояние меняется только
+    действиями, чтобы счётчики комментариев постов оставались верными.
+    """
+
+    search_fields = ['text']
+    date_field = 'created_at'
+    list_display = ['__str__', 'author', 'created_at', 'status', 'spam_score']
+    list_filter = ('status',)
+    list_select_related = ('post', 'author')
+    raw_id_fields = ['post']
+    autocomplete_fields = ['author']
+    readonly_fields = ['status', 'spam_score']
+    actions = ['approve_comments', 'reject_comments']
+
+    def search_text(self, queryset, text):
+        return queryset.filter(text__icontains=text)
+
+    @admin.action(description='Одобрить выбранные комментарии')
+    def approve_comments(self, request, queryset):
+        changed = set_comment_status(queryset, CommentStatus.APPROVED)
+        self.message_user(request, f'Одобрено комментариев: {changed}')
+
+    @admin.action(description='Отклонить выбранные комментарии')
+    def reject_comments(self, request, queryset):
+        changed = set_comment_status(queryset, CommentStatus.REJECTED)
+        self.message_user(request, f'Отклонено комментариев: {changed}')
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ['source', 'status', 'attempts', 'run_after']
+    list_filter = ('status',)
+    readonly_fields = ['post', 'source', 'locked_at', 'created_at']
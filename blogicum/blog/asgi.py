@@ -0,0 +1,197 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError, close_old_connections
+from django.db.models import Max
+from django.urls import Resolver404, resolve
+
+from .live import broker, render_comment_event
+from .models import VISIBLE_COMMENT_STATUSES, Comment, Post
+from .views import get_visible_posts_q
+
+HEARTBEAT_INTERVAL = 15
+
+REPLAY_LIMIT = 50
+
+POLL_INTERVAL = 2
+
+STREAM_VIEW_NAME = 'blog:comment_stream'
+
+STREAM_HEADERS = [
+    (b'Content-Type', b'text/event-stream'),
+    (b'Cache-Control', b'no-cache'),
+    (b'X-Accel-Buffering', b'no'),
+]
+
+
+def load_stream(post_id, last_event_id, latest=False):
+    """Проверка поста и одобренные комментарии после last_event_id.
+
+    Возвращает None, если пост скрыт от читателей, иначе список пар
+    (id, событие). При latest вторым значением возвращается id
+    последнего одобренного комментария поста.
+    """
+    close_old_connections()
+    try:
+        if not Post.objects.filter(get_visible_posts_q(), id=post_id).exists():
+            return None
+        visible = Comment.objects.filter(
+            post_id=post_id, status__in=VISIBLE_COMMENT_STATUSES
+        )
+        try:
+            comments = visible.filter(
+                id__gt=int(last_event_id)
+            ).select_related('author', 'post').order_by('id')[:REPLAY_LIMIT]
+        except ValueError:
+            comments = []
+        events = [
+            (comment.id, render_comment_event(comment))
+            for comment in comments
+        ]
+        if not latest:
+            return events
+        return events, visible.aggregate(last=Max('id'))['last'] or 0
+    finally:
+        close_old_connections()
+
+
+_pollers = {}
+
+
+async def poll_comments(post_id, last_id):
+    """Рассылка комментариев поста, одобренных в других процессах.
+
+    Комментарии одобряет score_comments или админка в другом процессе,
+    и их рассылка до подключений этого процесса не доходит. Поэтому,
+    пока у поста есть читатели, раз в POLL_INTERVAL секунд
+    выбираются одобренные комментарии с id больше last_id. Один опрос
+    на пост обслуживает всех его читателей; повторы клиент
+    отбрасывает по id. Комментарий, одобренный позже более нового,
+    придёт только после переподключения или перезагрузки страницы.
+    """
+    try:
+        while broker.has_subscribers(post_id):
+            await asyncio.sleep(POLL_INTERVAL)
+            try:
+                events = await sync_to_async(load_stream)(post_id, last_id)
+            except DatabaseError:
+                continue
+            if events is None:
+                break
+            for last_id, body in events:
+                broker.publish(post_id, body)
+    finally:
+        if _pollers.get(post_id) is asyncio.current_task():
+            del _pollers[post_id]
+
+
+def start_polling(post_id, last_id):
+    poller = _pollers.get(post_id)
+    if poller is None or poller.done():
+        _pollers[post_id] = asyncio.ensure_future(
+            poll_comments(post_id, last_id)
+        )
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def send_events(subscription, receive, send):
+    """Передача событий подписки до отключения клиента.
+
+    Пока событий нет, раз в HEARTBEAT_INTERVAL секунд уходит
+    комментарий, чтобы прокси не закрывали соединение.
+    """
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        while True:
+            event = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait(
+                {event, disconnect}, timeout=HEARTBEAT_INTERVAL,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if event not in done:
+                event.cancel()
+                if disconnect in done:
+                    return
+                body = b': ping\n\n'
+            elif event.result() is None:
+                break
+            else:
+                body = event.result()
+            await send({
+                'type': 'http.response.body', 'body': body, 'more_body': True,
+            })
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        disconnect.cancel()
+
+
+async def comment_stream(scope, receive, send, post_id):
+    """Новые комментарии поста в формате Server-Sent Events.
+
+    Подписка оформляется до чтения пропущенных событий, поэтому
+    комментарий, созданный в промежутке, не теряется; повтор
+    клиент отбрасывает по id.
+    """
+    last_event_id = dict(scope['headers']).get(b'last-event-id', b'')
+    subscription = broker.subscribe(post_id)
+    try:
+        loaded = await sync_to_async(load_stream)(
+            post_id, last_event_id.decode('latin1'), latest=True
+        )
+        if loaded is None:
+            await send({'type': 'http.response.start', 'status': 404})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        replay, last_id = loaded
+        start_polling(post_id, last_id)
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': STREAM_HEADERS,
+        })
+        for _, body in replay:
+            await send({
+                'type': 'http.response.body', 'body': body, 'more_body': True,
+            })
+        await send_events(subscription, receive, send)
+    finally:
+        broker.unsubscribe(post_id, subscription)
+
+
+def resolve_stream(scope):
+    """Номер поста, если запрос адресован потоку комментариев."""
+    if scope['type'] != 'http' or scope['method'] != 'GET':
+        return None
+    path = scope['path']
+    root_path = scope.get('root_path', '')
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return None
+    if match.view_name != STREAM_VIEW_NAME:
+        return None
+    return match.kwargs['post_id']
+
+
+class CommentStreamMiddleware:
+    """Обработка потоков комментариев в обход Django.
+
+    Django 3.2 перебирает потоковые ответы синхронно, поэтому каждое
+    открытое соединение заняло бы поток. Здесь поток обслуживает
+    корутина, а остальные запросы передаются приложению Django.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        post_id = resolve_stream(scope)
+        if post_id is None:
+            return await self.application(scope, receive, send)
+        return await comment_stream(scope, receive, send, post_id)
@@ -0,0 +1,122 @@
+import time
+from bisect import bisect_left
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Category, Post
+
+User = get_user_model()
+
+AUTOCOMPLETE_INDEX_TIMEOUT = 60
+
+AUTOCOMPLETE_LIMIT = 5
+
+_index = None
+
+
+class PrefixIndex:
+    """Поиск по началу строки в отсортированном массиве ключей.
+
+    Кроме всей строки, индексируется продолжение после каждого пробела,
+    поэтому «байк» находит и «Путешествие на Байкал». Поиск — двоичный,
+    время ответа зависит от числа совпадений, а не от размера индекса.
+    """
+
+    def __init__(self, entries):
+        keys = []
+        for label, item in entries:
+            words = label.casefold().split()
+            for position in range(len(words)):
+                keys.append((' '.join(words[position:]), len(keys), item))
+        keys.sort(key=lambda key: key[:2])
+        self.keys = [key for key, _, _ in keys]
+        self.items = [item for _, _, item in keys]
+
+    def search(self, prefix, limit, predicate=None):
+        prefix = ' '.join(prefix.casefold().split())
+        if not prefix:
+            return []
+        found = []
+        position = bisect_left(self.keys, prefix)
+        while (
+            position < len(self.keys)
+            and self.keys[position].startswith(prefix)
+            and len(found) < limit
+        ):
+            item = self.items[position]
+            if item not in found and (predicate is None or predicate(item)):
+                found.append(item)
+            position += 1
+        return found
+
+
+class AutocompleteIndex:
+    """Подсказки по заголовкам постов и категорий и именам авторов."""
+
+    def __init__(self):
+        posts = Post.objects.filter(
+            is_published=True, category__is_published=True
+        ).values_list('id', 'title', 'pub_date')
+        self.posts = PrefixIndex(
+            (title, {
+                'label': title,
+                'url': reverse('blog:post_detail', args=(pk,)),
+                'pub_date': pub_date,
+            })
+            for pk, title, pub_date in posts
+        )
+        self.categories = PrefixIndex(
+            (title, {
+                'label': title,
+                'url': reverse('blog:category_posts', args=(slug,)),
+            })
+            for title, slug in Category.objects.filter(
+                is_published=True
+            ).values_list('title', 'slug')
+        )
+        self.users = PrefixIndex(
+            (username, {
+                'label': username,
+                'url': reverse('blog:profile', args=(username,)),
+            })
+            for username in User.objects.filter(
+                is_active=True
+            ).values_list('username', flat=True)
+        )
+        self.expires = time.monotonic() + AUTOCOMPLETE_INDEX_TIMEOUT
+
+    def search(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        now = timezone.now()
+        posts = self.posts.search(
+            prefix, limit, lambda item: item['pub_date'] <= now
+        )
+        return {
+            'posts': [
+                {'label': item['label'], 'url': item['url']}
+                for item in posts
+            ],
+            'categories': self.categories.search(prefix, limit),
+            'users': self.users.search(prefix, limit),
+        }
+
+
+def get_autocomplete_index():
+    """Индекс подсказок из памяти процесса.
+
+    Как и кеш категорий, индекс сбрасывается сигналами только в своём
+    процессе, поэтому дополнительно живёт не дольше
+    AUTOCOMPLETE_INDEX_TIMEOUT секунд. Отложенные посты хранятся
+    в индексе и отбираются по дате публикации при каждом запросе.
+    """
+    global _index
+    index = _index
+    if index is None or index.expires <= time.monotonic():
+        index = _index = AutocompleteIndex()
+    return index
+
+
+def clear_autocomplete_index():
+    global _index
+    _index = None
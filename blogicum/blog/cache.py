@@ -0,0 +1,181 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+
+from .models import Category
+
+CATEGORY_CACHE_TIMEOUT = 60
+
+INDEX_FEED = 'index'
+
+_categories = {}
+
+
+def get_published_category(slug):
+    """Опубликованная категория по slug из кеша процесса.
+
+    Сигналы очищают кеш только в том процессе, где категорию изменили,
+    поэтому записи дополнительно живут не дольше CATEGORY_CACHE_TIMEOUT
+    секунд.
+    """
+    cached = _categories.get(slug)
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+    category = get_object_or_404(Category, slug=slug, is_published=True)
+    _categories[slug] = (
+        category, time.monotonic() + CATEGORY_CACHE_TIMEOUT
+    )
+    return category
+
+
+def clear_category_cache():
+    _categories.clear()
+
+
+def category_feed(category_id):
+    return f'category:{category_id}'
+
+
+def profile_feed(username):
+    return f'profile:{username}'
+
+
+def get_post_feeds(category_id, username):
+    """Ленты, в которых выводится пост с такими категорией и автором."""
+    feeds = {INDEX_FEED, profile_feed(username)}
+    if category_id is not None:
+        feeds.add(category_feed(category_id))
+    return feeds
+
+
+def get_feeds_of_posts(posts):
+    """Ленты, в которых выводится хотя бы один пост из выборки."""
+    feeds = set()
+    for category_id, username in posts.values_list(
+        'category_id', 'author__username'
+    ).distinct():
+        feeds |= get_post_feeds(category_id, username)
+    return feeds
+
+
+def _feed_version_key(feed):
+    return f'feed:version:{feed}'
+
+
+def get_feed_versions(feeds):
+    """Текущие версии лент; отсутствующие заводятся заново.
+
+    Новая версия берётся из часов, чтобы после вытеснения ключа из кеша
+    она не совпала ни с одной из прежних.
+    """
+    keys = [_feed_version_key(feed) for feed in feeds]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate_feeds(feeds):
+    """Сброс закешированных страниц и расписания перечисленных лент."""
+    for feed in feeds:
+        key = _feed_version_key(feed)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+    cache.delete_many([_feed_schedule_key(feed) for feed in feeds])
+
+
+def _feed_schedule_key(feed):
+    return f'feed:schedule:{feed}'
+
+
+_missing = object()
+
+
+def get_next_publication(feed, scheduled_posts):
+    """Дата ближайшей отложенной публикации в ленте или None.
+
+    Дата хранится в кеше до любого изменения постов ленты, поэтому
+    запрос к базе выполняется только после сброса расписания. Когда
+    сохранённая дата наступает, версия ленты увеличивается: страницы,
+    закешированные до выхода поста, больше не отдаются.
+    """
+    key = _feed_schedule_key(feed)
+    now = timezone.now()
+    next_pub_date = cache.get(key, _missing)
+    if next_pub_date is not _missing:
+        if next_pub_date is None or next_pub_date > now:
+            return next_pub_date
+        invalidate_feeds((feed,))
+    next_pub_date = scheduled_posts.filter(
+        pub_date__gt=now
+    ).order_by('pub_date').values_list('pub_date', flat=True).first()
+    cache.set(key, next_pub_date, None)
+    return next_pub_date
+
+
+class AnonymousPageCacheMixin:
+    """Кеширование целых страниц для анонимных посетителей.
+
+    Ключ страницы включает версию ленты из get_page_feed(), поэтому
+    сигналы сбрасывают только затронутые страницы, а срок хранения
+    не превышает времени до ближайшей отложенной публикации в ленте.
+    Авторизованным пользователям страница всегда строится заново:
+    на ней есть персональное содержимое.
+    """
+
+    page_cache_timeout = settings.PAGE_CACHE_TIMEOUT
+
+    def get_page_feed(self):
+        """Лента, изменения которой сбрасывают страницу."""
+        return None
+
+    def get_scheduled_posts(self):
+        """Посты ленты, которые станут видимы по наступлении pub_date."""
+        return None
+
+    def get_page_cache_timeout(self):
+        feed = self.get_page_feed()
+        if feed is None:
+            return self.page_cache_timeout
+        next_pub_date = get_next_publication(
+            feed, self.get_scheduled_posts()
+        )
+        if next_pub_date is None:
+            return self.page_cache_timeout
+        return min(
+            self.page_cache_timeout,
+            max((next_pub_date - timezone.now()).total_seconds(), 0),
+        )
+
+    def get_page_cache_key(self, request):
+        feed = self.get_page_feed()
+        version = get_feed_versions((feed,))[0] if feed else ''
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        return f'page:{feed or ""}:{version}:{path}'
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET' or request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+        timeout = self.get_page_cache_timeout()
+        key = self.get_page_cache_key(request)
+        response = cache.get(key)
+        if response is not None:
+            return response
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code != 200 or not timeout:
+            return response
+        if hasattr(response, 'render') and callable(response.render):
+            response.add_post_render_callback(
+                lambda r: cache.set(key, r, timeout)
+            )
+        else:
+            cache.set(key, response, timeout)
+        return response
@@ -1,13 +1,73 @@
+import warnings
+
 from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from PIL import Image
 
 from .models import Comment, Post, User
 
 
+class ImageHeaderField(forms.ImageField):
+    """Поле фото, проверяемое по размеру файла и заголовку.
+
+    Pillow читает только заголовок: размеры известны до декодирования
+    пикселей, поэтому слишком большие фото отклоняются сразу.
+    """
+
+    default_error_messages = {
+        'file_too_large': 'Размер файла не должен превышать %(limit)s МБ.',
+        'too_many_pixels': (
+            'Фото не должно быть больше %(limit)s мегапикселей.'
+        ),
+    }
+
+    def to_python(self, data):
+        f = forms.FileField.to_python(self, data)
+        if f is None:
+            return None
+        if f.size > settings.MAX_UPLOAD_SIZE:
+            raise ValidationError(
+                self.error_messages['file_too_large'],
+                code='file_too_large',
+                params={'limit': settings.MAX_UPLOAD_SIZE // 1024 ** 2},
+            )
+        if hasattr(data, 'temporary_file_path'):
+            file = data.temporary_file_path()
+        else:
+            file = data
+            file.seek(0)
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+                with Image.open(file) as image:
+                    image_format, pixels = image.format, (
+                        image.width * image.height
+                    )
+        except Image.DecompressionBombError:
+            pixels = None
+        except Exception as exc:
+            raise ValidationError(
+                self.error_messages['invalid_image'], code='invalid_image',
+            ) from exc
+        if pixels is None or pixels > settings.MAX_IMAGE_PIXELS:
+            raise ValidationError(
+                self.error_messages['too_many_pixels'],
+                code='too_many_pixels',
+                params={'limit': settings.MAX_IMAGE_PIXELS // 10 ** 6},
+            )
+        f.content_type = Image.MIME.get(image_format)
+        if hasattr(f, 'seek') and callable(f.seek):
+            f.seek(0)
+        return f
+
+
 class PostForm(forms.ModelForm):
 
     class Meta:
         model = Post
         exclude = ('author',)
+        field_classes = {'image': ImageHeaderField}
         widgets = {
             'text': forms.Textarea({'cols': '22', 'rows': '5'}),
             'pub_date': forms.DateTimeInput(
@@ -0,0 +1,173 @@
+import base64
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+RENDITION_WIDTHS = (160, 320, 640, 1280)
+
+ADMIN_PREVIEW_WIDTH = 160
+
+JPEG_QUALITY = 85
+
+MODERN_QUALITY = {'AVIF': 60, 'WEBP': 80}
+
+MODERN_MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+
+LQIP_WIDTH = 16
+
+LQIP_QUALITY = 40
+
+EXIF_ORIENTATION = 0x0112
+
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+def get_modern_formats():
+    """Современные форматы, которые умеет кодировать Pillow.
+
+    Порядок важен: браузер берёт первый подходящий <source>, поэтому
+    более компактный AVIF идёт раньше WebP.
+    """
+    Image.init()
+    formats = []
+    if 'AVIF' in Image.SAVE:
+        formats.append(('AVIF', 'avif'))
+    if features.check('webp'):
+        formats.append(('WEBP', 'webp'))
+    return formats
+
+
+def get_rendition_name(name, width, extension):
+    """Имя уменьшенной копии рядом с оригиналом."""
+    root, _ = posixpath.splitext(name)
+    return f'{root}.{width}w.{extension}'
+
+
+def read_image_size(file):
+    """Размеры фото по заголовку с учётом EXIF-поворота."""
+    with Image.open(file) as image:
+        width, height = image.size
+        orientation = image.getexif().get(EXIF_ORIENTATION)
+    if orientation in ROTATED_ORIENTATIONS:
+        width, height = height, width
+    return width, height
+
+
+def render_lqip(image):
+    """Крошечная размытая копия фото в виде data URI.
+
+    Выводится фоном <img>, пока не загрузится само фото.
+    """
+    width, height = image.size
+    tiny = image.convert('RGB').resize(
+        (LQIP_WIDTH, max(round(height * LQIP_WIDTH / width), 1)),
+        Image.Resampling.BILINEAR,
+    )
+    buffer = BytesIO()
+    tiny.save(buffer, 'JPEG', quality=LQIP_QUALITY, optimize=True)
+    data = base64.b64encode(buffer.getvalue()).decode('ascii')
+    return f'data:image/jpeg;base64,{data}'
+
+
+def _encode(image, image_format):
+    buffer = BytesIO()
+    if image_format == 'JPEG':
+        image.save(buffer, image_format, quality=JPEG_QUALITY,
+                   optimize=True, progressive=True)
+    elif image_format in MODERN_QUALITY:
+        image.save(buffer, image_format,
+                   quality=MODERN_QUALITY[image_format])
+    else:
+        image.save(buffer, image_format, optimize=True)
+    return buffer.getvalue()
+
+
+def render_renditions(data):
+    """Декодирование фото и подготовка уменьшенных копий.
+
+    Работает только с байтами, без базы и хранилища, поэтому может
+    выполняться в отдельном процессе. EXIF-поворот применяется к
+    пикселям, а сами метаданные в копии не попадают. Копии шире
+    оригинала не создаются. Каждая копия кодируется в базовый формат
+    (JPEG или PNG) и во все современные форматы из get_modern_formats().
+    Фото больше settings.MAX_IMAGE_PIXELS пикселей не декодируются:
+    загрузки из админки и скриптов не проходят проверку формы.
+    """
+    with Image.open(BytesIO(data)) as original:
+        if original.width * original.height > settings.MAX_IMAGE_PIXELS:
+            raise Image.DecompressionBombError(
+                f'{original.width}x{original.height} больше'
+                f' {settings.MAX_IMAGE_PIXELS} пикселей'
+            )
+        image = ImageOps.exif_transpose(original)
+        image.load()
+    has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+    if has_alpha:
+        image_format, extension = 'PNG', 'png'
+        image = image.convert('RGBA')
+    else:
+        image_format, extension = 'JPEG', 'jpg'
+        image = image.convert('RGB')
+    width, height = image.size
+    image_formats = [(image_format, extension), *get_modern_formats()]
+    renditions = []
+    for target_width in RENDITION_WIDTHS:
+        if target_width >= width:
+            break
+        resized = image.resize(
+            (target_width, round(height * target_width / width)),
+            Image.Resampling.LANCZOS,
+        )
+        for image_format, extension in image_formats:
+            renditions.append(
+                (target_width, extension, _encode(resized, image_format))
+            )
+    return {
+        'width': width,
+        'height': height,
+        'lqip': render_lqip(image),
+        'extension': image_formats[0][1],
+        'renditions': renditions,
+    }
+
+
+def save_renditions(field_file, rendered):
+    """Сохранение копий рядом с оригиналом; возвращает Post.image_meta.
+
+    Копии базового формата попадают в renditions, копии современных
+    форматов — в sources под своим расширением.
+    """
+    renditions = {}
+    sources = {extension: {} for _, extension in get_modern_formats()}
+    for width, extension, data in rendered['renditions']:
+        name = field_file.storage.save(
+            get_rendition_name(field_file.name, width, extension),
+            ContentFile(data),
+        )
+        if extension == rendered['extension']:
+            renditions[str(width)] = name
+        else:
+            sources.setdefault(extension, {})[str(width)] = name
+    return {
+        'source': field_file.name,
+        'width': rendered['width'],
+        'height': rendered['height'],
+        'lqip': rendered['lqip'],
+        'renditions': renditions,
+        'sources': sources,
+    }
+
+
+def get_rendition_names(image_meta):
+    names = set(image_meta.get('renditions', {}).values())
+    for widths in image_meta.get('sources', {}).values():
+        names.update(widths.values())
+    return names
+
+
+def delete_renditions(storage, image_meta, keep=()):
+    for name in get_rendition_names(image_meta) - set(keep):
+        storage.delete(name)
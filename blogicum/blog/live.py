@@ -0,0 +1,117 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.template.loader import render_to_string
+
+from .models import Comment
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class Subscription:
+    """Очередь событий одного подключения в его цикле событий."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+
+    def push(self, event):
+        """Передача события из любого потока.
+
+        Клиента, который не успевает забирать события, отключает None
+        в очереди: он переподключится и получит пропущенное
+        по Last-Event-ID.
+        """
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Цикл событий подключения уже закрыт.
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class Broker:
+    """Рассылка событий подключениям этого процесса.
+
+    Подписчики хранятся по постам, поэтому публикация затрагивает
+    только читателей одного поста. Простаивающее подключение — это
+    очередь и ожидающая корутина, опроса нет.
+    """
+
+    def __init__(self):
+        self.subscriptions = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(asyncio.get_running_loop())
+        with self.lock:
+            self.subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, channel, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[channel]
+
+    def has_subscribers(self, channel):
+        return channel in self.subscriptions
+
+    def publish(self, channel, event):
+        with self.lock:
+            subscriptions = tuple(self.subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.push(event)
+        return len(subscriptions)
+
+
+broker = Broker()
+
+
+def format_event(event, data, event_id=None):
+    """Событие в формате text/event-stream."""
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.extend(f'data: {line}' for line in data.splitlines() or [''])
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+def render_comment_event(comment):
+    """Событие с разметкой комментария.
+
+    Разметка общая для всех читателей, поэтому выводится без ссылок
+    на ответ и редактирование.
+    """
+    return format_event('comment', render_to_string(
+        'includes/comment.html', {'comment': comment, 'post': comment.post}
+    ), comment.id)
+
+
+def publish_comment(comment):
+    """Отправка комментария читателям поста в этом процессе."""
+    if broker.has_subscribers(comment.post_id):
+        broker.publish(comment.post_id, render_comment_event(comment))
+
+
+def publish_comments(rows):
+    """Отправка одобренных комментариев по парам (id, id поста).
+
+    Комментарии загружаются, только если у их постов есть читатели.
+    """
+    pks = [pk for pk, post_id in rows if broker.has_subscribers(post_id)]
+    if not pks:
+        return
+    for comment in Comment.objects.filter(pk__in=pks).select_related(
+        'author', 'post'
+    ).order_by('id'):
+        publish_comment(comment)
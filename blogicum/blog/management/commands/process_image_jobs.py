@@ -0,0 +1,62 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from blog.tasks import process_image_jobs
+
+BATCH_SIZE = 20
+
+POLL_INTERVAL = 5.0
+
+
+class Command(BaseCommand):
+    help = 'Обрабатывает очередь фото публикаций в пуле процессов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Размер пула процессов; 0 — обработка в текущем процессе.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько задач захватывать за один раз.'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=POLL_INTERVAL,
+            help='Пауза в секундах, когда очередь пуста.'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Завершиться, когда в очереди не останется готовых задач.'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        executor = ProcessPoolExecutor(workers) if workers else None
+        processed = 0
+        try:
+            while True:
+                batch = process_image_jobs(options['batch_size'], executor)
+                processed += batch
+                if batch:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано задач: {processed}')
+        )
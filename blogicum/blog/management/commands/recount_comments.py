@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from blog.cache import get_feeds_of_posts, invalidate_feeds
+from blog.models import VISIBLE_COMMENT_STATUSES, Comment, Post
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики комментариев у публикаций.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько публикаций проверять за одну транзакцию.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        repaired = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                posts = list(
+                    Post.objects.select_for_update().filter(
+                        id__gt=last_id
+                    ).order_by('id').only('id', 'comment_count')[:batch_size]
+                )
+                if not posts:
+                    break
+                last_id = posts[-1].id
+                counts = dict(
+                    Comment.objects.filter(
+                        post__in=posts, status__in=VISIBLE_COMMENT_STATUSES
+                    ).order_by().values_list('post').annotate(Count('id'))
+                )
+                drifted = []
+                for post in posts:
+                    actual = counts.get(post.id, 0)
+                    if post.comment_count != actual:
+                        post.comment_count = actual
+                        drifted.append(post)
+                Post.objects.bulk_update(drifted, ['comment_count'])
+            if drifted:
+                # bulk_update не отправляет сигналов, поэтому ленты
+                # с исправленными постами сбрасываются здесь.
+                invalidate_feeds(get_feeds_of_posts(
+                    Post.objects.filter(pk__in=[post.pk for post in drifted])
+                ))
+            repaired += len(drifted)
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено счётчиков: {repaired}')
+        )
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.spam import process_comment_scores
+
+BATCH_SIZE = 100
+
+POLL_INTERVAL = 5.0
+
+
+class Command(BaseCommand):
+    help = 'Проверяет новые комментарии на спам пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько комментариев проверять за один раз.'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=POLL_INTERVAL,
+            help='Пауза в секундах, когда новых комментариев нет.'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Завершиться, когда непроверенных комментариев не останется.'
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        try:
+            while True:
+                batch = process_comment_scores(options['batch_size'])
+                processed += batch
+                if batch:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(
+            self.style.SUCCESS(f'Проверено комментариев: {processed}')
+        )
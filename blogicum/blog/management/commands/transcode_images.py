@@ -0,0 +1,58 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from blog.tasks import get_posts_to_transcode, transcode_posts
+
+BATCH_SIZE = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт копии уже загруженных фото в современных форматах'
+        ' и их размытые превью.'
+        ' Обработанные посты отмечаются в image_meta, поэтому прерванный'
+        ' запуск можно продолжить.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Размер пула процессов; 0 — обработка в текущем процессе.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько постов обрабатывать за один раз.'
+        )
+
+    def handle(self, *args, **options):
+        posts = get_posts_to_transcode().order_by('pk')
+        total = posts.count()
+        workers = options['workers']
+        executor = ProcessPoolExecutor(workers) if workers else None
+        last_pk = 0
+        processed = transcoded = 0
+        try:
+            while True:
+                batch = list(
+                    posts.filter(pk__gt=last_pk)[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+                transcoded += transcode_posts(batch, executor)
+                processed += len(batch)
+                self.stdout.write(f'Обработано {processed} из {total}')
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлено фото: {transcoded}')
+        )
@@ -0,0 +1,153 @@
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .storage import IMMUTABLE_CACHE_CONTROL, is_content_addressed
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+X_ACCEL_REDIRECT = 'x-accel-redirect'
+
+X_SENDFILE = 'x-sendfile'
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """Границы (start, end) единственного диапазона из заголовка Range.
+
+    Для отсутствующего, некорректного или составного заголовка
+    возвращает None: клиент получит файл целиком.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        length = min(int(end), size)
+        if not length:
+            raise RangeNotSatisfiable
+        return size - length, size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size:
+        raise RangeNotSatisfiable
+    if start > end:
+        return None
+    return start, end
+
+
+class FileRange:
+    """Часть открытого файла, доступная для чтения.
+
+    fileno() сохранён: wsgi.file_wrapper сервера (gunicorn, uWSGI)
+    передаёт такие файлы через os.sendfile(), ограничиваясь
+    Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def _send_file(request, full_path, size, etag):
+    """Ответ с содержимым файла силами Python."""
+    try:
+        byte_range = (
+            parse_range(request.headers.get('Range'), size)
+            if request.headers.get('If-Range', etag) == etag else None
+        )
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    content_type = mimetypes.guess_type(full_path)[0]
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(
+            file, content_type=content_type or 'application/octet-stream'
+        )
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            FileRange(file, start, end - start + 1), status=206,
+            content_type=content_type or 'application/octet-stream',
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _delegate_file(path, full_path):
+    """Пустой ответ, по которому файл отдаёт фронт-сервер.
+
+    Диапазоны и сами байты обрабатывает прокси, Python в передаче
+    данных не участвует.
+    """
+    response = HttpResponse(content_type=mimetypes.guess_type(full_path)[0])
+    if settings.MEDIA_SERVE_MODE == X_ACCEL_REDIRECT:
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_REDIRECT_LOCATION + quote(path)
+        )
+    else:
+        response['X-Sendfile'] = full_path
+    return response
+
+
+def serve_media(request, path):
+    """Раздача загруженных файлов.
+
+    В режимах settings.MEDIA_SERVE_MODE «x-accel-redirect» (nginx) и
+    «x-sendfile» (Apache, lighttpd) передачу выполняет фронт-сервер.
+    Без прокси файл отдаётся через FileResponse с поддержкой Range.
+    Условные запросы обрабатываются в обоих случаях; файлы с именем
+    по хешу содержимого кешируются браузером навсегда.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        file_stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not stat.S_ISREG(file_stat.st_mode):
+        raise Http404
+    etag = quote_etag(f'{file_stat.st_mtime_ns:x}-{file_stat.st_size:x}')
+    last_modified = int(file_stat.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        if settings.MEDIA_SERVE_MODE in (X_ACCEL_REDIRECT, X_SENDFILE):
+            response = _delegate_file(path, full_path)
+        else:
+            response = _send_file(request, full_path, file_stat.st_size, etag)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if is_content_addressed(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.16 on 2026-10-17 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0020_comment_threads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='spam_score',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Оценка спама'),
+        ),
+        # Опубликованные ранее комментарии считаются одобренными.
+        migrations.AddField(
+            model_name='comment',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Не проверен'), (1, 'Одобрен'), (2, 'На модерации'), (3, 'Отклонён')], default=1, verbose_name='Модерация'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Не проверен'), (1, 'Одобрен'), (2, 'На модерации'), (3, 'Отклонён')], default=0, verbose_name='Модерация'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('status', 0)), fields=['id'], name='comment_unchecked_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-17 05:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0021_comment_moderation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Не проверен'), (1, 'Одобрен'), (2, 'На модерации'), (3, 'Отклонён')], default=1, verbose_name='Модерация'),
+        ),
+    ]
@@ -1,5 +1,9 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
+
+from .images import ADMIN_PREVIEW_WIDTH, MODERN_MIME_TYPES
+from .storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -7,6 +11,10 @@ TITLES_LENGTH = 256
 
 VISIBLE_TITLES_LENGTH = 25
 
+COMMENT_PATH_STEP = 10
+
+MAX_COMMENT_DEPTH = 6
+
 
 class CreatedAtIsPublishedModel(models.Model):
     is_published = models.BooleanField(default=True,
@@ -91,18 +99,125 @@ class Post(CreatedAtIsPublishedModel):
     image = models.ImageField(
         'Фото',
         upload_to='post_images',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+    updated_at = models.DateTimeField('Изменено', auto_now=True)
+    image_meta = models.JSONField(
+        'Сведения о фото',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
+        ordering = ('-pub_date', '-id')
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                condition=models.Q(is_published=True),
+                name='post_feed_idx',
+            ),
+            models.Index(
+                fields=('category', '-pub_date', '-id'),
+                condition=models.Q(is_published=True),
+                name='post_category_feed_idx',
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_feed_idx',
+            ),
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='post_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         return self.title[:VISIBLE_TITLES_LENGTH]
 
+    @property
+    def card_version(self):
+        """Всё, от чего зависит карточка поста, для ключа кеша."""
+        category, location = self.category, self.location
+        return (
+            self.updated_at,
+            self.comment_count,
+            self.author.username,
+            category and (category.slug, category.title,
+                          category.is_published),
+            location and (location.name, location.is_published),
+        )
+
+    def get_image_url(self, max_width):
+        """URL самой крупной копии фото не шире max_width.
+
+        Если подходящей копии нет, возвращает оригинал.
+        """
+        renditions = self.image_meta.get('renditions', {})
+        widths = [int(width) for width in renditions
+                  if int(width) <= max_width]
+        if not widths:
+            return self.image.url
+        return self.image.storage.url(renditions[str(max(widths))])
+
+    @property
+    def image_pending(self):
+        """Копии фото ещё готовятся фоновым обработчиком."""
+        return bool(self.image) and self.image_meta.get('pending', False)
+
+    @property
+    def image_src(self):
+        return self.get_image_url(640)
+
+    @property
+    def image_srcset(self):
+        """Уменьшенные копии фото для атрибута srcset."""
+        return self._get_srcset(self.image_meta.get('renditions', {}))
+
+    @property
+    def image_sources(self):
+        """Пары (MIME-тип, srcset) для элементов <source> внутри <picture>."""
+        return [
+            (MODERN_MIME_TYPES[extension], self._get_srcset(widths))
+            for extension, widths in self.image_meta.get('sources', {}).items()
+            if widths and extension in MODERN_MIME_TYPES
+        ]
+
+    def _get_srcset(self, names):
+        storage = self.image.storage
+        return ', '.join(
+            f'{storage.url(name)} {width}w' for width, name in names.items()
+        )
+
+    @property
+    def image_preview_url(self):
+        return self.get_image_url(ADMIN_PREVIEW_WIDTH)
+
+
+class CommentStatus(models.IntegerChoices):
+    NEW = 0, 'Не проверен'
+    APPROVED = 1, 'Одобрен'
+    PENDING = 2, 'На модерации'
+    REJECTED = 3, 'Отклонён'
+    DELETED = 4, 'Удалён'
+
 
 class Comment(models.Model):
+    """Комментарий; ответы хранятся деревом с материализованным путём.
+
+    path — id всех предков и самого комментария по COMMENT_PATH_STEP
+    шестнадцатеричных знаков, поэтому сортировка по path выстраивает
+    ветки в порядке обхода, а поддерево — это диапазон path.
+    """
+
     text = models.TextField('Комментарий')
     post = models.ForeignKey(
         Post,
@@ -111,14 +226,144 @@ class Comment(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
+    parent = models.ForeignKey(
+        'self',
+        verbose_name='Ответ на',
+        related_name='replies',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    path = models.CharField(
+        'Путь в ветке',
+        max_length=COMMENT_PATH_STEP * MAX_COMMENT_DEPTH,
+        default='',
+        editable=False,
+    )
+    # Комментарии из формы на сайте создаются непроверенными, а из
+    # админки и скриптов — сразу одобренными.
+    status = models.PositiveSmallIntegerField(
+        'Модерация',
+        choices=CommentStatus.choices,
+        default=CommentStatus.APPROVED,
+    )
+    spam_score = models.FloatField(
+        'Оценка спама',
+        null=True,
+        blank=True,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
-        ordering = ('created_at',)
+        ordering = ('created_at', 'id')
+        indexes = (
+            models.Index(
+                fields=('created_at',),
+                name='comment_created_at_idx',
+            ),
+            models.Index(
+                fields=('post', 'path'),
+                name='comment_thread_idx',
+            ),
+            models.Index(
+                fields=('post', 'path'),
+                condition=models.Q(parent__isnull=True),
+                name='comment_root_idx',
+            ),
+            models.Index(
+                fields=('id',),
+                condition=models.Q(status=CommentStatus.NEW),
+                name='comment_unchecked_idx',
+            ),
+        )
 
     def __str__(self):
         return (
             f'{self.post}, {self.author}, '
             f'{self.text[:30]}'
         )
+
+    @property
+    def is_visible(self):
+        return self.status in VISIBLE_COMMENT_STATUSES
+
+    def is_visible_to(self, user):
+        """Виден ли комментарий: чужие — после одобрения, свои — всегда."""
+        return self.is_visible or (
+            not self.is_deleted and self.author_id == user.pk
+        )
+
+    @property
+    def is_deleted(self):
+        return self.status == CommentStatus.DELETED
+
+    @property
+    def depth(self):
+        return max(len(self.path) // COMMENT_PATH_STEP - 1, 0)
+
+    def save(self, *args, **kwargs):
+        """Сохранение с расчётом пути.
+
+        Ответ глубже MAX_COMMENT_DEPTH становится соседом своего
+        родителя, поэтому глубина веток ограничена.
+        """
+        if self._state.adding and self.parent_id is not None:
+            parent_path = self.parent.path
+            if len(parent_path) >= COMMENT_PATH_STEP * MAX_COMMENT_DEPTH:
+                self.parent_id = int(
+                    parent_path[-2 * COMMENT_PATH_STEP:-COMMENT_PATH_STEP], 16
+                )
+        super().save(*args, **kwargs)
+        if not self.path:
+            parent_path = self.parent.path if self.parent_id else ''
+            self.path = parent_path + format(self.pk, f'0{COMMENT_PATH_STEP}x')
+            type(self).objects.filter(pk=self.pk).update(path=self.path)
+
+
+# Новые комментарии до проверки видит только автор.
+VISIBLE_COMMENT_STATUSES = (CommentStatus.APPROVED,)
+
+
+class ImageJob(models.Model):
+    """Фоновая обработка загруженного фото поста."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Готово'
+        FAILED = 'failed', 'Ошибка'
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='image_jobs',
+    )
+    source = models.CharField('Исходный файл', max_length=TITLES_LENGTH)
+    status = models.CharField(
+        'Состояние',
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    run_after = models.DateTimeField('Запустить после', default=timezone.now)
+    locked_at = models.DateTimeField('Взята в работу', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Добавлено', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'обработка фото'
+        verbose_name_plural = 'Обработка фото'
+        ordering = ('run_after',)
+        indexes = (
+            models.Index(
+                fields=('status', 'run_after'),
+                name='image_job_queue_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.source} ({self.get_status_display()})'
@@ -0,0 +1,293 @@
+import base64
+import binascii
+import collections.abc
+import hashlib
+import re
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db.models import CharField, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+COUNT_CACHE_TIMEOUT = 300
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(direction, value, pk):
+    """Непрозрачный токен позиции в ленте."""
+    raw = f'{direction}|{value.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Разбор токена в направление, дату и id объекта."""
+    try:
+        raw = base64.urlsafe_b64decode(
+            cursor + '=' * (-len(cursor) % 4)
+        ).decode()
+        direction, value, pk = raw.split('|')
+        value, pk = parse_datetime(value), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor('Некорректный курсор')
+    if direction not in (NEXT, PREVIOUS) or value is None:
+        raise InvalidCursor('Некорректный курсор')
+    return direction, value, pk
+
+
+class CursorPaginator:
+    """Пагинация по ключу (дата, id) без OFFSET и COUNT(*).
+
+    Каждая страница читается из индекса начиная с позиции,
+    закодированной в курсоре, поэтому стоимость запроса не зависит
+    от глубины страницы. По умолчанию лента идёт по pub_date от новых
+    к старым; field и descending задают другой порядок.
+    """
+
+    def __init__(self, object_list, per_page, field='pub_date',
+                 descending=True):
+        self.field = field
+        self.descending = descending
+        sign = '-' if descending else ''
+        self.object_list = object_list.order_by(sign + field, sign + 'id')
+        self.per_page = int(per_page)
+
+    def _following(self, value, pk, forward):
+        """Объекты после позиции (value, pk) в порядке ленты или до неё."""
+        later = forward != self.descending
+        objects = self.object_list.filter(**{
+            f'{self.field}__{"gte" if later else "lte"}': value
+        }).exclude(**{
+            self.field: value, f'id__{"lte" if later else "gte"}': pk
+        })
+        return objects if forward else objects.reverse()
+
+    def page(self, cursor=None):
+        if not cursor:
+            objects = list(self.object_list[:self.per_page + 1])
+            return CursorPage(
+                objects[:self.per_page], self,
+                has_next=len(objects) > self.per_page,
+                has_previous=False,
+            )
+        direction, value, pk = decode_cursor(cursor)
+        objects = list(
+            self._following(value, pk, direction == NEXT)[:self.per_page + 1]
+        )
+        if direction == NEXT:
+            return CursorPage(
+                objects[:self.per_page], self,
+                has_next=len(objects) > self.per_page,
+                has_previous=True,
+            )
+        return CursorPage(
+            objects[:self.per_page][::-1], self,
+            has_next=True,
+            has_previous=len(objects) > self.per_page,
+        )
+
+    def encode(self, direction, obj):
+        return encode_cursor(direction, getattr(obj, self.field), obj.pk)
+
+
+class ThreadPaginator:
+    """Пагинация комментариев по веткам верхнего уровня.
+
+    Страница — per_page корневых комментариев вместе со всеми ответами
+    в порядке path, выбранная одним запросом по диапазону path.
+    Верхняя граница — path первого корня следующей страницы, его
+    находит подзапрос. Курсор — path последнего корня страницы.
+
+    Если задан visible, невидимые комментарии убираются со страницы,
+    а на месте невидимых предков видимых ответов остаются заглушки
+    с is_tombstone, чтобы ответы не теряли свои ветки.
+    """
+
+    path_re = re.compile(r'^[0-9a-f]+$')
+
+    def __init__(self, object_list, per_page, path_step, visible=None):
+        self.object_list = object_list.order_by('path')
+        self.per_page = int(per_page)
+        self.path_step = path_step
+        self.visible = visible
+
+    def prune(self, objects):
+        needed = set()
+        kept = []
+        # Ответы идут после предков, поэтому обход с конца узнаёт
+        # о видимых потомках раньше, чем доходит до самого предка.
+        for obj in reversed(objects):
+            if self.visible(obj):
+                obj.is_tombstone = False
+            elif obj.path in needed:
+                obj.is_tombstone = True
+            else:
+                continue
+            kept.append(obj)
+            needed.update(
+                obj.path[:end]
+                for end in range(self.path_step, len(obj.path), self.path_step)
+            )
+        kept.reverse()
+        return kept
+
+    def page(self, cursor=None):
+        after = ''
+        if cursor:
+            if len(cursor) != self.path_step or not self.path_re.match(cursor):
+                raise InvalidCursor('Некорректный курсор')
+            # «~» больше любой цифры пути: ответы последнего корня
+            # предыдущей страницы тоже пропускаются.
+            after = cursor + '~'
+        upper = Subquery(
+            self.object_list.filter(
+                parent__isnull=True, path__gt=after
+            ).values('path')[self.per_page:self.per_page + 1]
+        )
+        objects = list(self.object_list.filter(
+            path__gt=after,
+            path__lte=Coalesce(upper, Value('~'), output_field=CharField()),
+        ))
+        roots = sum(obj.parent_id is None for obj in objects)
+        has_next = roots > self.per_page
+        if has_next:
+            objects.pop()
+        last = objects[-1] if objects else None
+        if self.visible is not None:
+            objects = self.prune(objects)
+        return ThreadPage(
+            objects, self, has_next=has_next, has_previous=bool(cursor),
+            last=last,
+        )
+
+    def encode(self, direction, obj):
+        return obj.path[:self.path_step]
+
+
+class CursorPage(collections.abc.Sequence):
+    """Страница ленты, знающая только о соседних страницах."""
+
+    cursor_based = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<Cursor page of {len(self)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return self.paginator.encode(NEXT, self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return self.paginator.encode(PREVIOUS, self.object_list[0])
+
+
+class ThreadPage(CursorPage):
+    """Страница веток комментариев.
+
+    Курсор берётся от последнего выбранного комментария, даже если
+    его ветка скрыта целиком.
+    """
+
+    def __init__(self, object_list, paginator, has_next, has_previous,
+                 last):
+        super().__init__(object_list, paginator, has_next, has_previous)
+        self.last = last
+
+    def has_next(self):
+        return self._has_next
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return self.paginator.encode(NEXT, self.last)
+
+
+class CachedCountPage(Page):
+
+    @property
+    def elided_page_range(self):
+        """Номера страниц вокруг текущей и по краям, с многоточиями."""
+        return self.paginator.get_elided_page_range(self.number)
+
+
+class CachedCountPaginator(Paginator):
+    """Постраничная пагинация с кешированным COUNT(*).
+
+    Число объектов хранится в кеше COUNT_CACHE_TIMEOUT секунд под ключом
+    из текста запроса, то есть отдельно для каждого набора фильтров.
+    Моменты времени в параметрах (например, «опубликовано до сейчас»;
+    SQLite получает их строками) округляются до того же интервала,
+    иначе ключ менялся бы при каждом запросе. Число может отставать
+    от базы не дольше этого интервала.
+    """
+
+    count_cache_timeout = COUNT_CACHE_TIMEOUT
+
+    def _get_page(self, *args, **kwargs):
+        return CachedCountPage(*args, **kwargs)
+
+    def _get_key_param(self, param):
+        moment = param
+        if isinstance(param, str):
+            try:
+                moment = parse_datetime(param)
+            except ValueError:
+                moment = None
+        if not isinstance(moment, datetime):
+            return param
+        return int(moment.timestamp()) // self.count_cache_timeout
+
+    def get_count_key(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None:
+            return None
+        sql, params = query.sql_with_params()
+        params = [self._get_key_param(param) for param in params]
+        digest = hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+        return f'count:{digest}'
+
+    @cached_property
+    def count(self):
+        try:
+            key = self.get_count_key()
+        except EmptyResultSet:
+            return 0
+        if key is None:
+            return super().count
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, self.count_cache_timeout)
+        return count
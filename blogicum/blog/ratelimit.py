@@ -0,0 +1,124 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import render
+
+RATE_PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+_buckets = {}
+
+_buckets_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """Ёмкость и период корзины из строки вида «10/m»."""
+    count, period = rate.split('/')
+    return int(count), RATE_PERIODS[period]
+
+
+def take_token(bucket, capacity, period, now):
+    """Корзина после списания жетона и ожидание до следующего.
+
+    Корзина — пара (жетоны, время); за период она наполняется
+    целиком. Ожидание нулевое, если жетон списан.
+    """
+    tokens, updated = bucket or (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * capacity / period)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) * period / capacity
+
+
+def consume(limits):
+    """Списание жетона сразу из всех корзин.
+
+    limits — словарь от ключа корзины к паре (ёмкость, период).
+    Жетон списывается, только если он есть во всех корзинах; иначе
+    возвращается число секунд до его появления. Корзины хранятся
+    в кеше Django, без обращения к базе; если кеш недоступен —
+    в памяти процесса. Чтение и запись корзин не атомарны, поэтому
+    при гонке запрос-другой может проскочить сверх лимита.
+    """
+    now = time.time()
+    try:
+        stored = cache.get_many(list(limits))
+    except Exception:
+        with _buckets_lock:
+            return _consume(_buckets, limits, now)
+    buckets = dict(stored)
+    wait = _consume(buckets, limits, now)
+    if not wait:
+        try:
+            cache.set_many(buckets, math.ceil(max(
+                period for _, period in limits.values()
+            )))
+        except Exception:
+            pass
+    return wait
+
+
+def _consume(buckets, limits, now):
+    updated = {}
+    wait = 0
+    for key, (capacity, period) in limits.items():
+        updated[key], key_wait = take_token(
+            buckets.get(key), capacity, period, now
+        )
+        wait = max(wait, key_wait)
+    if not wait:
+        buckets.update(updated)
+    return wait
+
+
+def get_client_ip(request):
+    """Адрес клиента с учётом settings.RATE_LIMIT_IP_HEADER.
+
+    Прокси дописывает адрес своего клиента в конец списка, поэтому
+    берётся последний адрес: предыдущие мог подставить сам клиент.
+    """
+    header = settings.RATE_LIMIT_IP_HEADER
+    if header and request.META.get(header):
+        return request.META[header].split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def clear_rate_limits():
+    with _buckets_lock:
+        _buckets.clear()
+
+
+class RateLimitMixin:
+    """Ограничение частоты POST-запросов к представлению.
+
+    Лимит на пользователя берётся из settings.RATE_LIMITS, на IP-адрес —
+    из settings.RATE_LIMITS_PER_IP, оба по rate_limit_scope. Сверх
+    лимита возвращается 429 с заголовком Retry-After.
+    """
+
+    rate_limit_scope = None
+
+    def get_rate_limits(self):
+        """Корзины запроса: ключ и пара (ёмкость, период)."""
+        request = self.request
+        prefix = f'ratelimit:{self.rate_limit_scope}'
+        limits = {}
+        rate = settings.RATE_LIMITS_PER_IP.get(self.rate_limit_scope)
+        if rate:
+            limits[f'{prefix}:ip:{get_client_ip(request)}'] = parse_rate(rate)
+        rate = settings.RATE_LIMITS.get(self.rate_limit_scope)
+        if rate and request.user.is_authenticated:
+            limits[f'{prefix}:user:{request.user.pk}'] = parse_rate(rate)
+        return limits
+
+    def dispatch(self, request, *args, **kwargs):
+        limits = self.get_rate_limits() if request.method == 'POST' else {}
+        if limits:
+            wait = consume(limits)
+            if wait:
+                response = render(request, 'pages/429.html', status=429)
+                response['Retry-After'] = math.ceil(wait)
+                return response
+        return super().dispatch(request, *args, **kwargs)
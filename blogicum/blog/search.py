@@ -0,0 +1,81 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+SEARCH_TABLE = 'blog_post_fts'
+
+SNIPPET_START = '\x02'
+
+SNIPPET_END = '\x03'
+
+SNIPPET_TOKENS = 24
+
+WORD_RE = re.compile(r'\w+')
+
+
+def build_match_query(query):
+    """Запрос FTS5 из строки, введённой пользователем.
+
+    Каждое слово берётся в кавычки, поэтому операторы FTS5 из строки
+    не срабатывают. Поиск идёт по началу слова: без стемминга так
+    находятся и другие окончания.
+    """
+    return ' '.join(f'"{word}"*' for word in WORD_RE.findall(query))
+
+
+def search_posts(posts, query):
+    """Посты из выборки, совпавшие с запросом, от самых релевантных.
+
+    У каждого поста появляются search_rank и search_snippet —
+    фрагмент текста с отмеченными совпадениями.
+    """
+    match = build_match_query(query)
+    if not match:
+        return posts.none()
+    return posts.extra(
+        select={
+            'search_rank': f'{SEARCH_TABLE}.rank',
+            'search_snippet': f'snippet({SEARCH_TABLE}, -1, %s, %s, %s, %s)',
+        },
+        select_params=(SNIPPET_START, SNIPPET_END, '…', SNIPPET_TOKENS),
+        tables=[SEARCH_TABLE],
+        where=[
+            f'{SEARCH_TABLE}.rowid = blog_post.id',
+            f'{SEARCH_TABLE} MATCH %s',
+        ],
+        params=[match],
+        order_by=['search_rank', '-pub_date', '-id'],
+    )
+
+
+def filter_posts(posts, query):
+    """Посты из выборки, совпавшие с запросом, без изменения порядка."""
+    match = build_match_query(query)
+    if not match:
+        return posts
+    return posts.filter(id__in=RawSQL(
+        f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+        (match,),
+    ))
+
+
+def highlight(snippet):
+    """HTML фрагмента, в котором совпадения обёрнуты в <mark>."""
+    return mark_safe(
+        escape(snippet)
+        .replace(SNIPPET_START, '<mark>')
+        .replace(SNIPPET_END, '</mark>')
+    )
+
+
+def rebuild_index():
+    """Полная переиндексация постов; возвращает их количество."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"
+        )
+        cursor.execute(f'SELECT count(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
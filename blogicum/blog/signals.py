@@ -0,0 +1,214 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .autocomplete import clear_autocomplete_index
+from .cache import (category_feed, clear_category_cache, get_feeds_of_posts,
+                    get_post_feeds, invalidate_feeds, profile_feed)
+from .models import Category, Comment, Location, Post
+from .tasks import enqueue_image_job, release_image
+
+User = get_user_model()
+
+PROFILE_FIELDS = frozenset((
+    'username', 'first_name', 'last_name', 'is_staff', 'date_joined',
+))
+
+_deleting = threading.local()
+
+
+def get_deleting_posts():
+    """Посты, которые удаляются в текущем потоке."""
+    if not hasattr(_deleting, 'posts'):
+        _deleting.posts = set()
+    return _deleting.posts
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleting_post(sender, instance, **kwargs):
+    """Отметка удаляемого поста.
+
+    Комментарии удаляются каскадом раньше самого поста; для отмеченных
+    постов их обработчики не обновляют счётчик и ленты — это сделают
+    обработчики поста, по одному разу на пост.
+    """
+    get_deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def forget_deleting_post(sender, instance, **kwargs):
+    get_deleting_posts().discard(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    """Увеличение счётчика комментариев поста.
+
+    Новый комментарий до проверки в счётчике не учитывается.
+    """
+    if created and instance.is_visible:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    """Уменьшение счётчика комментариев поста.
+
+    Срабатывает и при каскадном удалении, в том числе из админки.
+    Скрытые модерацией комментарии в счётчике не учтены.
+    """
+    if not instance.is_visible or (
+        instance.post_id in get_deleting_posts()
+    ):
+        return
+    Post.objects.filter(
+        pk=instance.post_id, comment_count__gt=0
+    ).update(comment_count=F('comment_count') - 1)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, **kwargs):
+    """Сброс кеша категорий после изменения любой из них."""
+    clear_category_cache()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=User)
+def invalidate_autocomplete_index(sender, **kwargs):
+    """Сброс индекса подсказок после изменения постов и категорий."""
+    clear_autocomplete_index()
+
+
+@receiver(post_save, sender=User)
+def invalidate_autocomplete_users(sender, update_fields=None, **kwargs):
+    """Сброс индекса подсказок, кроме сохранения одного last_login."""
+    if update_fields is None or {'username', 'is_active'} & set(update_fields):
+        clear_autocomplete_index()
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_category(sender, instance, raw=False, **kwargs):
+    """Запоминание прежней категории, чтобы сбросить и её ленту."""
+    if instance.pk and not raw:
+        instance._previous_category_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('category_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    """Сброс страниц лент, в которых выводится пост."""
+    username = instance.author.username
+    feeds = get_post_feeds(instance.category_id, username)
+    previous_category_id = getattr(instance, '_previous_category_id', None)
+    if previous_category_id != instance.category_id:
+        feeds |= get_post_feeds(previous_category_id, username)
+    invalidate_feeds(feeds)
+
+
+@receiver(post_save, sender=Comment)
+def invalidate_feeds_on_new_comment(sender, instance, created, **kwargs):
+    """Сброс лент поста: в карточке выводится число комментариев."""
+    if created and instance.is_visible:
+        invalidate_feeds(get_feeds_of_posts(
+            Post.objects.filter(pk=instance.post_id)
+        ))
+
+
+@receiver(post_delete, sender=Comment)
+def invalidate_feeds_on_deleted_comment(sender, instance, **kwargs):
+    if not instance.is_visible or (
+        instance.post_id in get_deleting_posts()
+    ):
+        return
+    invalidate_feeds(get_feeds_of_posts(
+        Post.objects.filter(pk=instance.post_id)
+    ))
+
+
+def get_related_feeds(instance):
+    """Ленты, которые выводят категорию или местоположение."""
+    feeds = get_feeds_of_posts(instance.posts.all())
+    if isinstance(instance, Category):
+        feeds.add(category_feed(instance.pk))
+    return feeds
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Location)
+def remember_feeds_of_posts(sender, instance, **kwargs):
+    """Запоминание лент до того, как у постов обнулится связь."""
+    instance._feeds = get_related_feeds(instance)
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Location)
+def invalidate_remembered_feeds(sender, instance, **kwargs):
+    invalidate_feeds(getattr(instance, '_feeds', ()))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Location)
+def invalidate_feeds_of_posts(sender, instance, **kwargs):
+    """Сброс лент с постами категории или местоположения."""
+    invalidate_feeds(get_related_feeds(instance))
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_profile(sender, instance, update_fields=None,
+                              raw=False, **kwargs):
+    """Запоминание полей, которые выводятся на странице профиля."""
+    if raw or not instance.pk or (
+        update_fields is not None and not PROFILE_FIELDS & set(update_fields)
+    ):
+        return
+    instance._previous_profile = User.objects.filter(
+        pk=instance.pk
+    ).values(*PROFILE_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_feeds(sender, instance, **kwargs):
+    """Сброс страниц профиля при изменении выводимых на ней полей.
+
+    При смене имени пользователя сбрасываются и ленты с его постами.
+    """
+    previous = instance.__dict__.pop('_previous_profile', None)
+    if previous is None or all(
+        getattr(instance, field) == value for field, value in previous.items()
+    ):
+        return
+    feeds = {profile_feed(instance.username)}
+    if previous['username'] != instance.username:
+        feeds |= get_feeds_of_posts(instance.posts.all())
+        feeds |= get_post_feeds(None, previous['username'])
+    invalidate_feeds(feeds)
+
+
+@receiver(post_save, sender=Post)
+def enqueue_image_processing(sender, instance, raw=False, **kwargs):
+    """Фоновая обработка нового или заменённого фото."""
+    if raw or instance.image.name == instance.image_meta.get('source', ''):
+        return
+    enqueue_image_job(instance)
+
+
+@receiver(post_delete, sender=Post)
+def release_post_image(sender, instance, **kwargs):
+    """Удаление фото поста, если его не использует другой пост."""
+    if instance.image:
+        release_image(
+            instance.image.storage,
+            {**instance.image_meta, 'source': instance.image.name},
+        )
@@ -0,0 +1,211 @@
+import re
+import zlib
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils.module_loading import import_string
+
+from .cache import get_feeds_of_posts, invalidate_feeds
+from .live import publish_comments
+from .models import VISIBLE_COMMENT_STATUSES, Comment, CommentStatus, Post
+
+WORD_RE = re.compile(r'\w+')
+
+LINK_RE = re.compile(r'https?://|www\.', re.IGNORECASE)
+
+REPEAT_RE = re.compile(r'(.)\1{9,}')
+
+LINK_WEIGHT = 0.4
+
+MIN_LETTERS_FOR_CAPS = 20
+
+CAPS_RATIO = 0.7
+
+SHINGLE_SIZE = 4
+
+DUPLICATE_WINDOW = timedelta(days=1)
+
+DUPLICATE_LOOKBACK = 1000
+
+DUPLICATE_SIMILARITY = 0.8
+
+
+def heuristic_score(comments):
+    """Текст капслоком и длинные повторы одного символа."""
+    scores = []
+    for comment in comments:
+        score = 0.0
+        letters = [char for char in comment.text if char.isalpha()]
+        if len(letters) >= MIN_LETTERS_FOR_CAPS and (
+            sum(char.isupper() for char in letters) / len(letters)
+            > CAPS_RATIO
+        ):
+            score += 0.5
+        if REPEAT_RE.search(comment.text):
+            score += 0.5
+        scores.append(score)
+    return scores
+
+
+def link_score(comments):
+    """Ссылки: каждая добавляет LINK_WEIGHT, не больше единицы."""
+    return [
+        min(len(LINK_RE.findall(comment.text)) * LINK_WEIGHT, 1.0)
+        for comment in comments
+    ]
+
+
+def shingle_hashes(text):
+    """Хеши всех последовательностей из SHINGLE_SIZE слов текста."""
+    words = WORD_RE.findall(text.casefold())
+    return frozenset(
+        zlib.crc32(' '.join(words[start:start + SHINGLE_SIZE]).encode())
+        for start in range(len(words) - SHINGLE_SIZE + 1)
+    )
+
+
+def duplicate_score(comments):
+    """Почти дословные копии недавних комментариев.
+
+    Сходство — доля общих шинглов (мера Жаккара) с каждым из
+    DUPLICATE_LOOKBACK последних комментариев за DUPLICATE_WINDOW,
+    включая остальные комментарии пачки. Сравнение идёт только с более
+    ранними комментариями, поэтому оригинал копией не считается.
+    Кандидатов находит обратный
+    индекс от шингла к комментариям, поэтому сравниваются только
+    тексты с общими шинглами.
+    """
+    since = min(comment.created_at for comment in comments) - DUPLICATE_WINDOW
+    texts = dict(
+        Comment.objects.filter(created_at__gte=since).order_by(
+            '-id'
+        ).values_list('id', 'text')[:DUPLICATE_LOOKBACK]
+    )
+    texts.update((comment.id, comment.text) for comment in comments)
+    shingles = {pk: shingle_hashes(text) for pk, text in texts.items()}
+    index = defaultdict(list)
+    for pk, hashes in shingles.items():
+        for shingle in hashes:
+            index[shingle].append(pk)
+    scores = []
+    for comment in comments:
+        hashes = shingles[comment.id]
+        shared = Counter(
+            pk for shingle in hashes for pk in index[shingle]
+            if pk < comment.id
+        )
+        similarity = max((
+            common / (len(hashes) + len(shingles[pk]) - common)
+            for pk, common in shared.items()
+        ), default=0.0)
+        scores.append(1.0 if similarity >= DUPLICATE_SIMILARITY else 0.0)
+    return scores
+
+
+def get_scorers():
+    return [import_string(path) for path in settings.SPAM_SCORERS]
+
+
+def score_comments(comments):
+    """Сумма оценок всех проверок из settings.SPAM_SCORERS.
+
+    Проверка получает всю пачку и возвращает по оценке на комментарий,
+    поэтому общие для пачки данные загружаются один раз.
+    """
+    totals = [0.0] * len(comments)
+    for scorer in get_scorers():
+        for position, score in enumerate(scorer(comments)):
+            totals[position] += score
+    return totals
+
+
+def set_comment_status(comments, status):
+    """Смена состояния комментариев из выборки.
+
+    Счётчики комментариев постов учитывают только видимые
+    комментарии, поэтому при скрытии или показе они исправляются,
+    а ленты с этими постами сбрасываются. Показанные комментарии после
+    фиксации транзакции рассылаются читателям поста. Возвращает число
+    изменённых комментариев.
+    """
+    visible = status in VISIBLE_COMMENT_STATUSES
+    with transaction.atomic():
+        rows = list(
+            comments.select_for_update().exclude(status=status).values_list(
+                'pk', 'post_id', 'status'
+            )
+        )
+        Comment.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(
+            status=status
+        )
+        deltas = Counter()
+        shown = []
+        for pk, post_id, previous in rows:
+            if (previous in VISIBLE_COMMENT_STATUSES) != visible:
+                deltas[post_id] += 1 if visible else -1
+                if visible:
+                    shown.append((pk, post_id))
+        for post_id, delta in deltas.items():
+            Post.objects.filter(pk=post_id).update(
+                comment_count=Greatest(F('comment_count') + delta, 0)
+            )
+        if shown:
+            transaction.on_commit(lambda: publish_comments(shown))
+    if deltas:
+        invalidate_feeds(get_feeds_of_posts(
+            Post.objects.filter(pk__in=deltas)
+        ))
+    return len(rows)
+
+
+def moderate_comments(comments):
+    """Оценка комментариев и решение по ним.
+
+    Комментарии с оценкой от settings.SPAM_THRESHOLD уходят
+    на модерацию, остальные одобряются. Состояние меняется, только
+    если модератор ещё не принял решение сам.
+    """
+    new = Comment.objects.filter(status=CommentStatus.NEW)
+    for comment, score in zip(comments, score_comments(comments)):
+        comment.spam_score = score
+    Comment.objects.bulk_update(comments, ['spam_score'])
+    held = [
+        comment.pk for comment in comments
+        if comment.spam_score >= settings.SPAM_THRESHOLD
+    ]
+    set_comment_status(new.filter(pk__in=held), CommentStatus.PENDING)
+    set_comment_status(
+        new.filter(pk__in=[comment.pk for comment in comments]).exclude(
+            pk__in=held
+        ),
+        CommentStatus.APPROVED,
+    )
+
+
+def process_comment_scores(limit):
+    """Оценка очередной пачки новых комментариев; возвращает её размер."""
+    comments = list(
+        Comment.objects.filter(status=CommentStatus.NEW).order_by('id')[:limit]
+    )
+    if comments:
+        moderate_comments(comments)
+    return len(comments)
+
+
+def reset_comment(comment):
+    """Повторная проверка изменённого комментария.
+
+    До новой оценки комментарий виден только автору. При
+    settings.SPAM_SCORING_EAGER оценка выполняется сразу.
+    """
+    Comment.objects.filter(pk=comment.pk).update(spam_score=None)
+    set_comment_status(
+        Comment.objects.filter(pk=comment.pk), CommentStatus.NEW
+    )
+    comment.status, comment.spam_score = CommentStatus.NEW, None
+    if settings.SPAM_SCORING_EAGER:
+        moderate_comments([comment])
@@ -0,0 +1,48 @@
+import hashlib
+import posixpath
+import re
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+HASHED_NAME_RE = re.compile(r'(^|/)[0-9a-f]{64}\.\w+$')
+
+
+def is_content_addressed(name):
+    """Назван ли файл по хешу своего содержимого."""
+    return HASHED_NAME_RE.search(name) is not None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, именующее файлы по SHA-256 содержимого.
+
+    Одинаковые загрузки получают одно имя и хранятся в одном экземпляре.
+    Первый каталог исходного имени (upload_to) сохраняется, а файлы
+    раскладываются по подкаталогам из первых символов хеша. Содержимое
+    файла с таким именем не меняется, поэтому его можно кешировать
+    навсегда.
+    """
+
+    def get_content_name(self, name, content):
+        sha256 = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        digest = sha256.hexdigest()
+        prefix = name.split('/', 1)[0] if '/' in name else ''
+        extension = posixpath.splitext(name)[1].lower()
+        return posixpath.join(prefix, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        name = self.get_content_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
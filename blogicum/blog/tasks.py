@@ -0,0 +1,210 @@
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import get_feeds_of_posts, invalidate_feeds
+from .images import (delete_renditions, get_rendition_names,
+                     read_image_size, render_renditions, save_renditions)
+from .models import ImageJob, Post
+
+MAX_ATTEMPTS = 5
+
+RETRY_DELAY = timedelta(seconds=30)
+
+LEASE_TIMEOUT = timedelta(minutes=10)
+
+
+def release_image(storage, image_meta, keep=(), exclude_pk=None):
+    """Удаление фото и его копий, на которые не ссылается ни один пост.
+
+    Одинаковые загрузки хранятся в одном файле, поэтому число ссылок
+    на фото — это число постов с ним. Пока оно не нулевое, файлы
+    не трогаются. Имена из keep не удаляются никогда.
+    """
+    source = image_meta.get('source', '')
+    if source and Post.objects.filter(image=source).exclude(
+        pk=exclude_pk
+    ).exists():
+        return
+    delete_renditions(storage, image_meta, keep)
+    if source and source not in keep:
+        storage.delete(source)
+
+
+def enqueue_image_job(post):
+    """Постановка фото в очередь; до обработки выводится заглушка.
+
+    Размеры фото читаются из заголовка сразу, чтобы заглушка занимала
+    столько же места, сколько фото. Прежнее фото поста удаляется, если
+    оно больше нигде не используется.
+    """
+    release_image(post.image.storage, post.image_meta)
+    post.image_meta = {}
+    if post.image:
+        post.image_meta = {'source': post.image.name, 'pending': True}
+        try:
+            with post.image.storage.open(post.image.name, 'rb') as source:
+                width, height = read_image_size(source)
+        except Exception:
+            pass
+        else:
+            post.image_meta.update(width=width, height=height)
+        ImageJob.objects.create(post=post, source=post.image.name)
+    Post.objects.filter(pk=post.pk).update(image_meta=post.image_meta)
+
+
+def claim_image_jobs(limit):
+    """Захват готовых к запуску задач.
+
+    Задача считается захваченной, только если условный UPDATE изменил
+    её строку, поэтому несколько обработчиков не возьмут одну задачу.
+    Задачи, зависшие в работе дольше LEASE_TIMEOUT, возвращаются
+    в очередь.
+    """
+    now = timezone.now()
+    candidates = ImageJob.objects.filter(
+        Q(status=ImageJob.Status.PENDING, run_after__lte=now)
+        | Q(status=ImageJob.Status.RUNNING, locked_at__lt=now - LEASE_TIMEOUT)
+    ).values_list('pk', 'status', 'locked_at')[:limit]
+    claimed = []
+    for pk, status, locked_at in candidates:
+        if ImageJob.objects.filter(
+            pk=pk, status=status, locked_at=locked_at
+        ).update(status=ImageJob.Status.RUNNING, locked_at=now):
+            claimed.append(pk)
+    return list(ImageJob.objects.filter(pk__in=claimed).select_related('post'))
+
+
+def apply_renditions(post, source, rendered):
+    """Сохранение копий и запись их в Post.image_meta.
+
+    Запись выполняется, только если фото поста всё ещё source, иначе
+    сохранённые копии удаляются. Возвращает записанные сведения о фото
+    или None.
+    """
+    image_meta = save_renditions(post.image, rendered)
+    updated = Post.objects.filter(pk=post.pk, image=source).update(
+        image_meta=image_meta, updated_at=timezone.now()
+    )
+    if not updated:
+        release_image(post.image.storage, image_meta)
+        return None
+    invalidate_feeds(get_feeds_of_posts(Post.objects.filter(pk=post.pk)))
+    return image_meta
+
+
+def complete_image_job(job, rendered):
+    """Сохранение копий и показ фото вместо заглушки."""
+    if job.post.image.name == job.source:
+        apply_renditions(job.post, job.source, rendered)
+    job.status = ImageJob.Status.DONE
+    job.last_error = ''
+    job.save(update_fields=('status', 'last_error'))
+
+
+def fail_image_job(job, error):
+    """Повтор с экспоненциальной задержкой или окончательная ошибка.
+
+    После последней попытки фото выводится без уменьшенных копий.
+    """
+    job.attempts += 1
+    job.last_error = f'{type(error).__name__}: {error}'
+    if job.attempts < MAX_ATTEMPTS:
+        job.status = ImageJob.Status.PENDING
+        job.run_after = timezone.now() + RETRY_DELAY * 2 ** (job.attempts - 1)
+    else:
+        job.status = ImageJob.Status.FAILED
+        Post.objects.filter(pk=job.post_id, image=job.source).update(
+            image_meta={'source': job.source}, updated_at=timezone.now()
+        )
+    job.save(update_fields=('attempts', 'last_error', 'status', 'run_after'))
+
+
+def read_source(job):
+    with job.post.image.storage.open(job.source, 'rb') as source:
+        return source.read()
+
+
+def process_image_jobs(limit, executor=None):
+    """Обработка очередной пачки задач; возвращает их количество.
+
+    Декодирование и сжатие выполняются в executor (пуле процессов),
+    работа с базой и хранилищем остаётся в текущем процессе.
+    """
+    jobs = claim_image_jobs(limit)
+    pending = []
+    for job in jobs:
+        if job.post.image.name != job.source:
+            complete_image_job(job, None)
+            continue
+        try:
+            data = read_source(job)
+        except OSError as error:
+            fail_image_job(job, error)
+            continue
+        if executor is None:
+            pending.append((job, None, data))
+        else:
+            pending.append((job, executor.submit(render_renditions, data),
+                            None))
+    for job, future, data in pending:
+        try:
+            rendered = (
+                render_renditions(data) if future is None else future.result()
+            )
+            complete_image_job(job, rendered)
+        except Exception as error:
+            fail_image_job(job, error)
+    return len(jobs)
+
+
+def get_posts_to_transcode():
+    """Фото без копий в современных форматах или без LQIP.
+
+    Сюда попадают и посты со старым или пустым image_meta, и фото,
+    задача которых завершилась ошибкой. Фото в очереди пропускаются:
+    их копии создаст задача.
+    """
+    return Post.objects.exclude(image='').exclude(
+        image_meta__has_key='pending'
+    ).filter(
+        ~Q(image_meta__has_key='sources') | ~Q(image_meta__has_key='lqip')
+    )
+
+
+def transcode_posts(posts, executor=None):
+    """Пересоздание копий фото для пачки постов.
+
+    Старые копии удаляются только после записи новых, поэтому прерванный
+    запуск не оставляет пост без фото. Копии с тем же содержимым
+    получают прежние имена и сохраняются. Возвращает число обновлённых постов.
+    """
+    pending = []
+    for post in posts:
+        try:
+            with post.image.open('rb') as source:
+                data = source.read()
+        except OSError:
+            continue
+        if executor is None:
+            pending.append((post, None, data))
+        else:
+            pending.append((post, executor.submit(render_renditions, data),
+                            None))
+    transcoded = 0
+    for post, future, data in pending:
+        previous_meta = post.image_meta
+        try:
+            rendered = (
+                render_renditions(data) if future is None else future.result()
+            )
+        except Exception:
+            continue
+        source = post.image.name
+        image_meta = apply_renditions(post, source, rendered)
+        if image_meta is not None:
+            keep = get_rendition_names(image_meta) | {source}
+            release_image(post.image.storage, previous_meta, keep, post.pk)
+            transcoded += 1
+    return transcoded
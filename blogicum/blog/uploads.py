@@ -0,0 +1,70 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import (SkipFile,
+                                             TemporaryFileUploadHandler)
+
+
+class RejectedUpload(UploadedFile):
+    """Пустая заглушка загрузки, отброшенной из-за размера.
+
+    Размер — сколько данных пришло до отказа, поэтому форма отклоняет
+    файл тем же сообщением, что и любой слишком большой файл.
+    """
+
+    def __init__(self, name, content_type, size, charset=None):
+        super().__init__(BytesIO(), name, content_type, size, charset)
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Запись загрузок во временный файл частями с ограничением размера.
+
+    В памяти держится только текущая часть, поэтому расход памяти
+    не зависит от размера файла. Как только файл превышает
+    settings.MAX_UPLOAD_SIZE, временный файл удаляется, а остаток
+    загрузки пропускается без записи и подсчёта; в request.rejected_uploads
+    остаётся заглушка для формы.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.MAX_UPLOAD_SIZE:
+            if not hasattr(self.request, 'rejected_uploads'):
+                self.request.rejected_uploads = []
+            self.request.rejected_uploads.append((
+                self.field_name,
+                RejectedUpload(self.file_name, self.content_type,
+                               self.received, self.charset),
+            ))
+            raise SkipFile
+        self.file.write(raw_data)
+
+
+class RejectedUploadsMiddleware:
+    """Передача формам заглушек отброшенных загрузок.
+
+    Отброшенный файл не попадает в request.FILES, и форма приняла бы
+    запрос без него. Поэтому тело multipart-запроса разбирается до
+    вызова представления, а заглушки добавляются в request.FILES.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method != 'POST' or (
+            request.content_type != 'multipart/form-data'
+        ):
+            return None
+        files = request.FILES
+        for field_name, upload in getattr(request, 'rejected_uploads', ()):
+            files.appendlist(field_name, upload)
+        return None
@@ -40,6 +40,16 @@ urlpatterns = [
         views.PostDeleteView.as_view(),
         name='delete_post'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.CommentPageView.as_view(),
+        name='comments'
+    ),
+    path(
+        'posts/<int:post_id>/comments/stream/',
+        views.CommentStreamView.as_view(),
+        name='comment_stream'
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.CommentCreateView.as_view(),
@@ -55,6 +65,16 @@ urlpatterns = [
         views.PostDetailView.as_view(),
         name='post_detail'
     ),
+    path(
+        'search/',
+        views.PostSearchView.as_view(),
+        name='search'
+    ),
+    path(
+        'autocomplete/',
+        views.AutocompleteView.as_view(),
+        name='autocomplete'
+    ),
     path('category/<slug:category_slug>/',
          views.CategoryListView.as_view(),
          name='category_posts'),
@@ -1,38 +1,68 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Count
-from django.shortcuts import get_object_or_404, redirect
+from django.core.paginator import InvalidPage
+from django.db import transaction
+from django.db.models import BooleanField, Case, Q, Value, When
+from django.http import Http404, HttpResponse, JsonResponse, QueryDict
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.views.generic import (CreateView, DeleteView, DetailView, ListView,
-                                  UpdateView)
+                                  UpdateView, View)
 
+from .autocomplete import get_autocomplete_index
+from .cache import (INDEX_FEED, AnonymousPageCacheMixin, category_feed,
+                    get_published_category, profile_feed)
 from .forms import CommentForm, PostForm, UserCreateForm
-from .models import Category, Comment, Post
+from .models import COMMENT_PATH_STEP, Comment, CommentStatus, Post
+from .paginators import (CachedCountPaginator, CursorPaginator,
+                         ThreadPaginator)
+from .ratelimit import RateLimitMixin
+from .search import highlight, search_posts
+from .spam import moderate_comments, reset_comment, set_comment_status
 
 PAGINATION_OF_POSTS = 10
 
+PAGINATION_OF_COMMENTS = 20
+
 User = get_user_model()
 
 
+def get_visible_posts_q():
+    """Условие видимости поста для всех, кроме автора."""
+    return Q(
+        pub_date__lte=timezone.now(),
+        is_published=True,
+        category__is_published=True
+    )
+
+
 def get_filtered_posts(posts):
     """Получение списка постов."""
     return posts.select_related(
         'category',
         'location',
         'author'
-    ).filter(
-        pub_date__lte=timezone.now(),
-        is_published=True,
-        category__is_published=True
-    )
+    ).filter(get_visible_posts_q())
+
 
+class CursorPaginationMixin:
+    """Курсорная пагинация ленты с поддержкой старых ссылок ?page=N."""
 
-def get_comment_count(posts):
-    """Аннотация комментариев к постам."""
-    return posts.annotate(
-        comment_count=Count('comments')
-    ).order_by('-pub_date')
+    cursor_kwarg = 'cursor'
+    paginator_class = CachedCountPaginator
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.page_kwarg in self.request.GET:
+            return super().paginate_queryset(queryset, page_size)
+        paginator = CursorPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidPage as e:
+            raise Http404(str(e))
+        return paginator, page, page.object_list, page.has_other_pages()
 
 
 class UserUpdateView(LoginRequiredMixin, UpdateView):
@@ -50,7 +80,8 @@ class UserUpdateView(LoginRequiredMixin, UpdateView):
         return reverse('blog:profile', kwargs={'username': username})
 
 
-class UserDetailView(ListView):
+class UserDetailView(AnonymousPageCacheMixin, CursorPaginationMixin,
+                     ListView):
     """Информация о пользователе (профиль пользователя)."""
 
     model = Post
@@ -58,27 +89,40 @@ class UserDetailView(ListView):
     slug_url_kwargs = 'username'
     template_name = 'blog/profile.html'
 
-    def get_object(self):
-        return get_object_or_404(
-            User,
-            username=self.kwargs[self.slug_url_kwargs]
+    def get_page_feed(self):
+        return profile_feed(self.kwargs[self.slug_url_kwargs])
+
+    def get_scheduled_posts(self):
+        return self.model.objects.filter(
+            author__username=self.kwargs[self.slug_url_kwargs],
+            is_published=True,
+            category__is_published=True,
         )
 
+    @cached_property
+    def profile(self):
+        username = self.kwargs[self.slug_url_kwargs]
+        if self.request.user.get_username() == username:
+            return self.request.user
+        return get_object_or_404(User, username=username)
+
+    def get_object(self):
+        return self.profile
+
     def get_context_data(self, **kwargs):
         return dict(
             **super().get_context_data(**kwargs),
-            profile=self.get_object()
+            profile=self.profile
         )
 
     def get_queryset(self):
-        author = self.get_object()
-        posts = get_comment_count(author.posts)
-        if author == self.request.user:
-            return posts
-        return get_filtered_posts(posts)
+        if self.profile == self.request.user:
+            return self.profile.posts.select_related('category', 'location')
+        return get_filtered_posts(self.profile.posts)
 
 
-class HomeListView(ListView):
+class HomeListView(AnonymousPageCacheMixin, CursorPaginationMixin,
+                   ListView):
     """Главная страница."""
 
     model = Post
@@ -86,15 +130,62 @@ class HomeListView(ListView):
     ordering = '-created_at'
     paginate_by = PAGINATION_OF_POSTS
 
+    def get_page_feed(self):
+        return INDEX_FEED
+
+    def get_scheduled_posts(self):
+        return self.model.objects.filter(
+            is_published=True,
+            category__is_published=True,
+        )
+
+    def get_queryset(self):
+        return get_filtered_posts(self.model.objects)
+
+
+class PostSearchView(ListView):
+    """Полнотекстовый поиск по опубликованным постам."""
+
+    model = Post
+    template_name = 'blog/search.html'
+    paginate_by = PAGINATION_OF_POSTS
+    paginator_class = CachedCountPaginator
+    query_kwarg = 'q'
+
+    @cached_property
+    def query(self):
+        return self.request.GET.get(self.query_kwarg, '').strip()
+
     def get_queryset(self):
-        return get_comment_count(
-            get_filtered_posts(self.model.objects)
+        return search_posts(get_filtered_posts(self.model.objects), self.query)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        for post in context['page_obj']:
+            post.snippet = highlight(post.search_snippet)
+        page_query = QueryDict(mutable=True)
+        page_query[self.query_kwarg] = self.query
+        return dict(
+            **context,
+            query=self.query,
+            page_query=page_query.urlencode() + '&',
         )
 
 
-class PostCreateView(LoginRequiredMixin, CreateView):
+class AutocompleteView(View):
+    """Подсказки при вводе: посты, категории и авторы по началу строки."""
+
+    query_kwarg = 'q'
+
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get(self.query_kwarg, '')
+        return JsonResponse(get_autocomplete_index().search(query))
+
+
+class PostCreateView(LoginRequiredMixin, RateLimitMixin, CreateView):
     """Создание поста."""
 
+    rate_limit_scope = 'post'
     model = Post
     template_name = 'blog/create.html'
     form_class = PostForm
@@ -108,6 +199,51 @@ class PostCreateView(LoginRequiredMixin, CreateView):
         return reverse('blog:profile', kwargs={'username': username})
 
 
+def get_viewable_post(request, post_id):
+    """Пост, который видит пользователь: опубликованный или свой."""
+    post = get_object_or_404(
+        Post.objects.select_related(
+            'category', 'location', 'author'
+        ).annotate(
+            is_visible=Case(
+                When(get_visible_posts_q(), then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            )
+        ),
+        id=post_id
+    )
+    if not post.is_visible and post.author != request.user:
+        raise Http404('Публикация недоступна')
+    return post
+
+
+def parse_id(value):
+    """Номер объекта из параметра запроса или None."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_comments_page(post, user, cursor=None):
+    """Страница веток комментариев поста от старых к новым.
+
+    Скрытые модерацией комментарии видит только их автор; остальным
+    на месте скрытых и удалённых комментариев с ответами выводятся
+    заглушки.
+    """
+    paginator = ThreadPaginator(
+        post.comments.select_related('author'),
+        PAGINATION_OF_COMMENTS, COMMENT_PATH_STEP,
+        visible=lambda comment: comment.is_visible_to(user),
+    )
+    try:
+        return paginator.page(cursor)
+    except InvalidPage as e:
+        raise Http404(str(e))
+
+
 class PostDetailView(DetailView):
     """Просмотр поста в отдельной странице."""
 
@@ -116,24 +252,46 @@ class PostDetailView(DetailView):
     pk_url_kwarg = 'id'
 
     def get_object(self):
-        queryset = self.model.objects.select_related(
-            'category', 'location', 'author')
-        post = super().get_object(queryset)
-        if post.author != self.request.user:
-            queryset = get_filtered_posts(queryset)
-        return get_object_or_404(
-            queryset,
-            id=self.kwargs[self.pk_url_kwarg]
-        )
+        return get_viewable_post(self.request, self.kwargs[self.pk_url_kwarg])
+
+    def get_reply_to(self):
+        """Комментарий, на который пользователь пишет ответ."""
+        reply_to = parse_id(self.request.GET.get('reply_to'))
+        if reply_to is None or not self.request.user.is_authenticated:
+            return None
+        comment = self.object.comments.select_related('author').filter(
+            id=reply_to
+        ).first()
+        if comment is None or not comment.is_visible_to(self.request.user):
+            return None
+        return comment
 
     def get_context_data(self, **kwargs):
         return dict(
             **super().get_context_data(**kwargs),
-            comments=self.object.comments.select_related('author'),
+            comments=get_comments_page(
+                self.object, self.request.user, self.request.GET.get('cursor')
+            ),
+            reply_to=self.get_reply_to(),
             form=CommentForm()
         )
 
 
+class CommentPageView(View):
+    """Следующая страница комментариев фрагментом HTML для подгрузки."""
+
+    template_name = 'includes/comment_list.html'
+
+    def get(self, request, *args, **kwargs):
+        post = get_viewable_post(request, kwargs['post_id'])
+        return render(request, self.template_name, {
+            'post': post,
+            'comments': get_comments_page(
+                post, request.user, request.GET.get('cursor')
+            ),
+        })
+
+
 class MixinPostComment(UserPassesTestMixin):
 
     def test_func(self):
@@ -176,7 +334,8 @@ class PostDeleteView(LoginRequiredMixin, PostUpdateDeleteMixin, DeleteView):
         )
 
 
-class CategoryListView(ListView):
+class CategoryListView(AnonymousPageCacheMixin, CursorPaginationMixin,
+                       ListView):
     """Посты из отдельной категории."""
 
     template_name = 'blog/category.html'
@@ -184,28 +343,30 @@ class CategoryListView(ListView):
     slug_url_kwarg = 'category_slug'
     paginate_by = PAGINATION_OF_POSTS
 
+    def get_page_feed(self):
+        return category_feed(self.category.id)
+
+    def get_scheduled_posts(self):
+        return self.category.posts.filter(is_published=True)
+
+    @cached_property
+    def category(self):
+        return get_published_category(self.kwargs[self.slug_url_kwarg])
+
     def get_queryset(self):
-        category = get_object_or_404(
-            Category,
-            slug=self.kwargs[self.slug_url_kwarg],
-            is_published=True
-        )
-        query_set = get_filtered_posts(category.posts)
-        return get_comment_count(query_set)
+        return get_filtered_posts(self.category.posts)
 
     def get_context_data(self, **kwargs):
         return dict(
             **super().get_context_data(**kwargs),
-            category=get_object_or_404(
-                Category,
-                slug=self.kwargs[self.slug_url_kwarg],
-                is_published=True),
+            category=self.category,
         )
 
 
-class CommentCreateView(LoginRequiredMixin, CreateView):
+class CommentCreateView(LoginRequiredMixin, RateLimitMixin, CreateView):
     """Создание комментария."""
 
+    rate_limit_scope = 'comment'
     model = Comment
     form_class = CommentForm
     template_name = 'blog/comment.html'
@@ -213,17 +374,41 @@ class CommentCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.author = self.request.user
+        form.instance.status = CommentStatus.NEW
         form.instance.post = get_object_or_404(
             Post,
             id=self.kwargs[self.pk_url_kwarg]
         )
-        return super().form_valid(form)
+        if self.request.POST.get('parent'):
+            parent = Comment.objects.filter(
+                id=parse_id(self.request.POST['parent']),
+                post=form.instance.post,
+            ).first()
+            if parent is None or not parent.is_visible_to(self.request.user):
+                raise Http404('Комментарий не найден')
+            form.instance.parent = parent
+        with transaction.atomic():
+            response = super().form_valid(form)
+            if settings.SPAM_SCORING_EAGER:
+                moderate_comments([self.object])
+        return response
 
     def get_success_url(self):
         return reverse_lazy(
             'blog:post_detail', kwargs={'id': self.kwargs[self.pk_url_kwarg]})
 
 
+class CommentStreamView(View):
+    """Поток новых комментариев вне ASGI.
+
+    Поток обслуживает blog.asgi.CommentStreamMiddleware; при запуске
+    через WSGI ответ 204 останавливает переподключения EventSource.
+    """
+
+    def get(self, request, post_id):
+        return HttpResponse(status=204)
+
+
 class CommentMixin(LoginRequiredMixin, MixinPostComment):
     """Миксин для комментариев."""
 
@@ -233,10 +418,40 @@ class CommentMixin(LoginRequiredMixin, MixinPostComment):
     success_url = reverse_lazy('blog:index')
     pk_url_kwarg = 'comment_id'
 
+    def get_queryset(self):
+        return Comment.objects.exclude(status=CommentStatus.DELETED)
+
 
 class CommentDeleteView(CommentMixin, DeleteView):
-    """Удаление комментария."""
+    """Удаление комментария.
+
+    Комментарий с ответами остаётся в ветке заглушкой без текста,
+    чтобы вместе с ним не удалились чужие ответы.
+    """
+
+    def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        if not self.object.replies.exists():
+            return super().delete(request, *args, **kwargs)
+        with transaction.atomic():
+            Comment.objects.filter(pk=self.object.pk).update(text='')
+            set_comment_status(
+                Comment.objects.filter(pk=self.object.pk),
+                CommentStatus.DELETED,
+            )
+        return redirect(self.get_success_url())
 
 
 class CommentUpdateView(CommentMixin, UpdateView):
-    """Изменение комментария."""
+    """Изменение комментария.
+
+    Изменённый текст проверяется заново, до проверки его видит
+    только автор.
+    """
+
+    def form_valid(self, form):
+        with transaction.atomic():
+            response = super().form_valid(form)
+            if form.has_changed():
+                reset_comment(self.object)
+        return response
@@ -28,6 +28,7 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+    'blog.uploads.RejectedUploadsMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -62,6 +63,44 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+PAGE_CACHE_TIMEOUT = 60 * 15
+
+# Запросов на пользователя: «число/период», период — s, m, h или d.
+RATE_LIMITS = {
+    'comment': '10/m',
+    'post': '5/m',
+}
+
+# Запросов на IP-адрес; за одним адресом бывает много пользователей.
+RATE_LIMITS_PER_IP = {
+    'comment': '100/m',
+    'post': '50/m',
+}
+
+# Заголовок с адресом клиента от доверенного прокси, например
+# 'HTTP_X_FORWARDED_FOR'; берётся последний адрес списка. Без прокси —
+# None, иначе клиент сможет подставить любой адрес.
+RATE_LIMIT_IP_HEADER = None
+
+# Проверки новых комментариев; их оценки складываются.
+SPAM_SCORERS = [
+    'blog.spam.heuristic_score',
+    'blog.spam.link_score',
+    'blog.spam.duplicate_score',
+]
+
+# Комментарии с суммой оценок не ниже порога уходят на модерацию.
+SPAM_THRESHOLD = 1.0
+
+# Проверять комментарии сразу при сохранении, а не в score_comments.
+SPAM_SCORING_EAGER = False
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -104,6 +143,21 @@ LOGIN_REDIRECT_URL = 'blog:index'
 
 MEDIA_ROOT = BASE_DIR / 'media/'
 
+MEDIA_URL = '/media/'
+
+# 'python', 'x-accel-redirect' (nginx) или 'x-sendfile' (Apache, lighttpd).
+MEDIA_SERVE_MODE = 'python'
+
+MEDIA_ACCEL_REDIRECT_LOCATION = '/protected-media/'
+
 EMAIL_BACKEND = 'django.pages.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
+
+FILE_UPLOAD_HANDLERS = [
+    'blog.uploads.LimitedUploadHandler',
+]
+
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+
+MAX_IMAGE_PIXELS = 40_000_000
@@ -1,6 +1,8 @@
 from django.shortcuts import render
 from django.views.generic import TemplateView
 
+from blog.cache import AnonymousPageCacheMixin
+
 
 def page_not_found(request, exception):
     return render(request, 'pages/404.html', status=404)
@@ -14,9 +16,9 @@ def csrf_failure(request, reason=''):
     return render(request, 'pages/403csrf.html', status=403)
 
 
-class AboutTemplateView(TemplateView):
+class AboutTemplateView(AnonymousPageCacheMixin, TemplateView):
     template_name = 'pages/about.html'
 
 
-class RulesTemplateView(TemplateView):
+class RulesTemplateView(AnonymousPageCacheMixin, TemplateView):
     template_name = 'pages/rules.html'
@@ -32,6 +32,23 @@ def enable_debug_false():
         yield
 
 
+@pytest.fixture
+def score_comments_eagerly(settings):
+    """Комментарии из формы проверяются сразу, без score_comments."""
+    settings.SPAM_SCORING_EAGER = True
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from blog.autocomplete import clear_autocomplete_index
+    from blog.ratelimit import clear_rate_limits
+    from django.core.cache import cache
+    cache.clear()
+    clear_autocomplete_index()
+    clear_rate_limits()
+    yield
+
+
 class SafeImportFromContextManager:
     def __init__(
             self,
@@ -354,6 +371,8 @@ def cleanup(request):
                     filename.endswith(".jpg")
                     or filename.endswith(".gif")
                     or filename.endswith(".png")
+                    or filename.endswith(".webp")
+                    or filename.endswith(".avif")
             ):
                 file_path = os.path.join(root, filename)
                 if os.path.getmtime(file_path) >= start_time:
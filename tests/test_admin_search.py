@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import pytest
+from django.utils import timezone
+
+
+def changelist_ids(client, model, query):
+    response = client.get(f'/admin/blog/{model}/', {'q': query})
+    assert response.status_code == 200
+    return {obj.id for obj in response.context['cl'].result_list}
+
+
+def aware(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+@pytest.fixture
+def admin_posts(mixer, user, another_user, published_category):
+    return {
+        'user_march': mixer.blend(
+            'blog.Post', author=user, category=published_category,
+            title='Весенний Байкал', pub_date=aware(2023, 3, 10, 12)
+        ),
+        'user_may': mixer.blend(
+            'blog.Post', author=user, category=published_category,
+            title='Пирог', pub_date=aware(2023, 5, 1, 12)
+        ),
+        'another_march': mixer.blend(
+            'blog.Post', author=another_user, category=published_category,
+            title='Байкал зимой', pub_date=aware(2023, 3, 20, 12)
+        ),
+    }
+
+
+@pytest.mark.django_db
+def test_post_admin_search(admin_client, user, admin_posts):
+    ids = {name: post.id for name, post in admin_posts.items()}
+    assert changelist_ids(admin_client, 'post', f'@{user.username}') == {
+        ids['user_march'], ids['user_may']
+    }, "Убедитесь, что в админке посты ищутся по имени автора через @."
+    assert changelist_ids(admin_client, 'post', '2023-03') == {
+        ids['user_march'], ids['another_march']
+    }, "Убедитесь, что в админке посты ищутся по месяцу публикации."
+    assert changelist_ids(
+        admin_client, 'post', '2023-03-15..2023-05-01'
+    ) == {ids['another_march'], ids['user_may']}
+    assert changelist_ids(
+        admin_client, 'post', f'байкал @{user.username[:2]}'
+    ) == {ids['user_march']}, (
+        "Убедитесь, что слова запроса ищутся полнотекстовым поиском."
+    )
+
+
+@pytest.mark.django_db
+def test_comment_admin_search(admin_client, comment_to_a_post):
+    today = timezone.localdate(comment_to_a_post.created_at).isoformat()
+    assert changelist_ids(admin_client, 'comment', today) == {
+        comment_to_a_post.id
+    }
+    assert changelist_ids(admin_client, 'comment', '2000-01-01') == set()
+    author = comment_to_a_post.author.username
+    assert changelist_ids(admin_client, 'comment', f'@{author}') == {
+        comment_to_a_post.id
+    }
+
+
+@pytest.mark.django_db
+def test_post_change_form_has_no_user_select(admin_client, admin_posts):
+    post = admin_posts['user_march']
+    content = admin_client.get(
+        f'/admin/blog/post/{post.id}/change/'
+    ).content.decode('utf-8')
+    assert 'admin-autocomplete' in content, (
+        "Убедитесь, что автор, категория и местоположение выбираются"
+        " через автодополнение, а не списком всех записей."
+    )
@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+
+def suggest(client, query):
+    return client.get('/autocomplete/', {'q': query}).json()
+
+
+@pytest.fixture
+def indexed(mixer, user, published_category):
+    post = mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        title='Путешествие на Байкал'
+    )
+    mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        title='Байкал завтра', pub_date=timezone.now() + timedelta(days=1)
+    )
+    return post
+
+
+@pytest.mark.django_db
+def test_prefix_suggestions(client, user, published_category, indexed):
+    result = suggest(client, 'байк')
+    assert result['posts'] == [{
+        'label': indexed.title, 'url': f'/posts/{indexed.id}/',
+    }], (
+        "Убедитесь, что подсказки находят опубликованные посты по началу"
+        " любого слова заголовка."
+    )
+    category = suggest(client, published_category.title[:3])['categories']
+    assert category[0]['url'] == f'/category/{published_category.slug}/'
+    users = suggest(client, user.username[:2].upper())['users']
+    assert users[0]['url'] == f'/profile/{user.username}/'
+
+
+@pytest.mark.django_db
+def test_suggestions_served_from_memory(
+        client, indexed, django_assert_num_queries
+):
+    suggest(client, 'б')
+    with django_assert_num_queries(0):
+        suggest(client, 'ба')
+        suggest(client, 'бай')
+
+
+@pytest.mark.django_db
+def test_index_refreshed_on_change(client, indexed):
+    suggest(client, 'байк')
+    indexed.title = 'Озеро Байкал'
+    indexed.save()
+    assert [post['label'] for post in suggest(client, 'озе')['posts']] == [
+        'Озеро Байкал'
+    ], "Убедитесь, что индекс подсказок обновляется при изменении поста."
+
+
+@pytest.mark.django_db
+def test_empty_query(client, indexed):
+    assert suggest(client, '  ') == {
+        'posts': [], 'categories': [], 'users': []
+    }
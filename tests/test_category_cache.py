@@ -0,0 +1,45 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def count_category_lookups(client, url):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    return response, sum(
+        query['sql'].startswith('SELECT')
+        and 'FROM "blog_category" WHERE' in query['sql']
+        for query in ctx.captured_queries
+    )
+
+
+@pytest.mark.django_db
+def test_category_resolved_once(unlogged_client, published_category):
+    url = f'/category/{published_category.slug}/'
+    _, lookups = count_category_lookups(unlogged_client, url)
+    assert lookups <= 1, (
+        "Убедитесь, что страница категории запрашивает категорию не более"
+        " одного раза."
+    )
+    _, lookups = count_category_lookups(unlogged_client, url)
+    assert lookups == 0, (
+        "Убедитесь, что повторный запрос страницы категории берёт категорию"
+        " из кеша."
+    )
+
+
+@pytest.mark.django_db
+def test_category_cache_invalidated(unlogged_client, published_category):
+    url = f'/category/{published_category.slug}/'
+    unlogged_client.get(url)
+    published_category.title = 'Новое название категории'
+    published_category.save()
+    response, _ = count_category_lookups(unlogged_client, url)
+    assert response.context['category'].title == 'Новое название категории'
+
+    published_category.is_published = False
+    published_category.save()
+    assert unlogged_client.get(url).status_code == 404, (
+        "Убедитесь, что снятая с публикации категория сразу пропадает"
+        " из кеша."
+    )
@@ -97,6 +97,7 @@ def create_comment_creation_forms(
         return forms_to_create
 
 
+@pytest.mark.usefixtures('score_comments_eagerly')
 @pytest.mark.django_db(transaction=True)
 def test_comment(
         user_client: django.test.Client,
@@ -0,0 +1,83 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.mark.usefixtures('score_comments_eagerly')
+@pytest.mark.django_db
+def test_comment_count_follows_comments(
+        user_client, user, post_with_published_location
+):
+    post = post_with_published_location
+    assert post.comment_count == 0, (
+        "Убедитесь, что у новой публикации счётчик комментариев равен нулю."
+    )
+    for text in ('Первый', 'Второй'):
+        user_client.post(f'/posts/{post.id}/comment/', data={'text': text})
+    post.refresh_from_db()
+    assert post.comment_count == 2, (
+        "Убедитесь, что при добавлении комментария увеличивается счётчик"
+        " комментариев публикации."
+    )
+    comment = post.comments.first()
+    user_client.post(f'/posts/{post.id}/delete_comment/{comment.id}/')
+    post.refresh_from_db()
+    assert post.comment_count == 1, (
+        "Убедитесь, что при удалении комментария уменьшается счётчик"
+        " комментариев публикации."
+    )
+
+
+@pytest.mark.django_db
+def test_recount_comments_repairs_drift(
+        post_with_published_location, comment_to_a_post
+):
+    post = post_with_published_location
+    type(post).objects.filter(pk=post.pk).update(comment_count=42)
+    out = StringIO()
+    call_command('recount_comments', batch_size=1, stdout=out)
+    post.refresh_from_db()
+    assert post.comment_count == 1, (
+        "Убедитесь, что команда `recount_comments` исправляет счётчики"
+        " комментариев."
+    )
+    assert 'Исправлено счётчиков: 1' in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_recount_comments_invalidates_feeds(
+        unlogged_client, post_with_published_location, comment_to_a_post
+):
+    post = post_with_published_location
+    type(post).objects.filter(pk=post.pk).update(comment_count=42)
+    assert '(42)' in unlogged_client.get('/').content.decode('utf-8')
+    call_command('recount_comments', stdout=StringIO())
+    content = unlogged_client.get('/').content.decode('utf-8')
+    assert '(42)' not in content and '(1)' in content, (
+        "Убедитесь, что после пересчёта ленты не показывают старые"
+        " счётчики из кеша."
+    )
+
+
+@pytest.mark.django_db
+def test_post_delete_queries_do_not_grow_with_comments(
+        mixer, user, published_category, published_location,
+        django_assert_max_num_queries
+):
+    def make_post(comments):
+        post = mixer.blend(
+            'blog.Post', author=user, category=published_category,
+            location=published_location, is_published=True,
+        )
+        mixer.cycle(comments).blend('blog.Comment', post=post, author=user)
+        return post
+
+    small, large = make_post(1), make_post(50)
+    with CaptureQueriesContext(connection) as queries:
+        small.delete()
+    with django_assert_max_num_queries(len(queries)):
+        large.delete()
+    assert not large.comments.exists()
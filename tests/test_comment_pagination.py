@@ -0,0 +1,59 @@
+import pytest
+from blog.views import PAGINATION_OF_COMMENTS
+from bs4 import BeautifulSoup
+
+
+def comment_ids(content):
+    soup = BeautifulSoup(content.decode('utf-8'), features='html.parser')
+    return [
+        int(anchor['name'].removeprefix('comment_'))
+        for anchor in soup.select('a[name^=comment_]')
+    ], soup.select_one('[data-fragment-url]')
+
+
+@pytest.fixture
+def many_comments(mixer, post_with_published_location, user):
+    return mixer.cycle(PAGINATION_OF_COMMENTS + 5).blend(
+        'blog.Comment', post=post_with_published_location, author=user
+    )
+
+
+@pytest.mark.django_db
+def test_comments_paginated(
+        client, post_with_published_location, many_comments,
+        django_assert_num_queries
+):
+    post = post_with_published_location
+    expected = [comment.id for comment in many_comments]
+    first_page, more = comment_ids(client.get(f'/posts/{post.id}/').content)
+    assert first_page == expected[:PAGINATION_OF_COMMENTS], (
+        "Убедитесь, что на странице поста выводится только первая страница"
+        " комментариев в порядке их создания."
+    )
+    assert more is not None, (
+        "Убедитесь, что под комментариями есть ссылка на следующую страницу."
+    )
+    with django_assert_num_queries(2):
+        response = client.get(more['data-fragment-url'])
+    rest, more = comment_ids(response.content)
+    assert rest == expected[PAGINATION_OF_COMMENTS:], (
+        "Убедитесь, что фрагмент возвращает следующие комментарии."
+    )
+    assert more is None
+    assert '<html' not in response.content.decode('utf-8')
+
+
+@pytest.mark.django_db
+def test_comment_fragment_respects_visibility(
+        client, user_client, unpublished_posts_with_published_locations
+):
+    post = unpublished_posts_with_published_locations[0]
+    assert client.get(f'/posts/{post.id}/comments/').status_code == 404
+    assert user_client.get(f'/posts/{post.id}/comments/').status_code == 200
+
+
+@pytest.mark.django_db
+def test_invalid_comment_cursor(client, post_with_published_location):
+    post = post_with_published_location
+    response = client.get(f'/posts/{post.id}/comments/?cursor=garbage')
+    assert response.status_code == 404
@@ -0,0 +1,221 @@
+import asyncio
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from blog import asgi, spam
+from blog.asgi import CommentStreamMiddleware
+from blog.live import Broker, broker, format_event, publish_comment
+from blog.models import Comment, CommentStatus
+
+
+def make_scope(path, headers=()):
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'root_path': '',
+        'query_string': b'',
+        'headers': list(headers),
+    }
+
+
+async def passthrough(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 418})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+@async_to_sync
+async def open_stream(path, headers=(), publish=None, events=1):
+    """Ответ потока: статус и тела, пока не придёт events событий."""
+    disconnect = asyncio.Event()
+    messages = []
+
+    async def receive():
+        await disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+        body = message.get('body', b'')
+        if message.get('status', 200) != 200 or (
+            sum(m.get('body', b'').count(b'event:') for m in messages)
+            >= events
+        ):
+            disconnect.set()
+        elif message['type'] == 'http.response.body' and not (
+            body or message.get('more_body')
+        ):
+            disconnect.set()
+
+    application = CommentStreamMiddleware(passthrough)
+    task = asyncio.ensure_future(application(make_scope(path, headers),
+                                             receive, send))
+    if publish is not None:
+        while not messages and not task.done():
+            await asyncio.sleep(0.01)
+        await sync_to_async(publish)()
+    await asyncio.wait_for(task, 5)
+    return messages[0]['status'], b''.join(
+        message.get('body', b'') for message in messages[1:]
+    )
+
+
+def test_format_event_splits_lines():
+    assert format_event('comment', 'a\nb', 7) == (
+        b'event: comment\nid: 7\ndata: a\ndata: b\n\n'
+    ), "Убедитесь, что многострочные данные передаются строками data."
+
+
+def test_broker_fans_out_from_other_thread():
+    local = Broker()
+
+    async def listen():
+        first = local.subscribe(1)
+        second = local.subscribe(1)
+        other = local.subscribe(2)
+        thread = threading.Thread(target=local.publish, args=(1, b'x'))
+        thread.start()
+        events = await asyncio.wait_for(
+            asyncio.gather(first.queue.get(), second.queue.get()), 1
+        )
+        thread.join()
+        assert other.queue.empty(), (
+            "Убедитесь, что события получают только читатели этого поста."
+        )
+        for subscription in (first, second):
+            local.unsubscribe(1, subscription)
+        local.unsubscribe(2, other)
+        return events
+
+    assert asyncio.run(listen()) == [b'x', b'x']
+    assert not local.subscriptions, (
+        "Убедитесь, что после отписки записи о посте не остаётся."
+    )
+
+
+def test_other_paths_reach_django():
+    status, _ = open_stream('/posts/1/')
+    assert status == 418
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stream_pushes_new_comment(post_with_published_location, user):
+    post = post_with_published_location
+    comment = Comment(post=post, author=user, text='Живой комментарий')
+
+    def publish():
+        comment.save()
+        publish_comment(comment)
+
+    status, body = open_stream(
+        f'/posts/{post.id}/comments/stream/', publish=publish
+    )
+    assert status == 200
+    assert f'id: {comment.id}'.encode() in body
+    assert 'Живой комментарий'.encode() in body, (
+        "Убедитесь, что поток передаёт разметку нового комментария."
+    )
+    assert not broker.has_subscribers(post.id), (
+        "Убедитесь, что отключившийся клиент удаляется из рассылки."
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stream_replays_missed_comments(
+        mixer, post_with_published_location, user
+):
+    post = post_with_published_location
+    seen, missed = mixer.cycle(2).blend(
+        'blog.Comment', post=post, author=user
+    )
+    status, body = open_stream(
+        f'/posts/{post.id}/comments/stream/',
+        headers=[(b'last-event-id', str(seen.id).encode())],
+    )
+    assert status == 200
+    assert f'id: {missed.id}'.encode() in body
+    assert f'id: {seen.id}\n'.encode() not in body, (
+        "Убедитесь, что после переподключения приходят только"
+        " пропущенные комментарии."
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stream_polls_comments_approved_elsewhere(
+        settings, monkeypatch, post_with_published_location, user
+):
+    settings.SPAM_SCORING_EAGER = False
+    monkeypatch.setattr(asgi, 'POLL_INTERVAL', 0.05)
+    # score_comments работает в отдельном процессе, где у поста
+    # нет читателей.
+    monkeypatch.setattr(spam, 'publish_comments', lambda rows: None)
+    post = post_with_published_location
+
+    def approve():
+        comment = Comment.objects.create(
+            post=post, author=user, text='Проверенный комментарий',
+            status=CommentStatus.NEW,
+        )
+        spam.process_comment_scores(10)
+        return comment
+
+    status, body = open_stream(
+        f'/posts/{post.id}/comments/stream/', publish=approve
+    )
+    assert status == 200
+    assert 'Проверенный комментарий'.encode() in body, (
+        "Убедитесь, что поток передаёт комментарии, одобренные"
+        " в другом процессе."
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('last_event_id', [b'\xb2', b'abc'])
+def test_stream_ignores_bad_last_event_id(
+        mixer, post_with_published_location, user, last_event_id
+):
+    post = post_with_published_location
+    mixer.blend('blog.Comment', post=post, author=user)
+    status, body = open_stream(
+        f'/posts/{post.id}/comments/stream/',
+        headers=[(b'last-event-id', last_event_id)], events=0,
+    )
+    assert status == 200, (
+        "Убедитесь, что неверный Last-Event-ID не ломает поток."
+    )
+    assert b'event:' not in body
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stream_hidden_post(unpublished_posts_with_published_locations):
+    post = unpublished_posts_with_published_locations[0]
+    status, _ = open_stream(f'/posts/{post.id}/comments/stream/')
+    assert status == 404
+
+
+@pytest.mark.usefixtures('score_comments_eagerly')
+@pytest.mark.django_db
+def test_comment_create_publishes(
+        user_client, post_with_published_location,
+        django_capture_on_commit_callbacks, monkeypatch
+):
+    post = post_with_published_location
+    published = []
+    monkeypatch.setattr(
+        broker, 'publish',
+        lambda channel, event: published.append((channel, event)),
+    )
+    monkeypatch.setattr(broker, 'has_subscribers', lambda channel: True)
+    with django_capture_on_commit_callbacks(execute=True):
+        user_client.post(f'/posts/{post.id}/comment/', data={'text': 'Новый'})
+    assert [channel for channel, _ in published] == [post.id], (
+        "Убедитесь, что новый комментарий рассылается читателям поста."
+    )
+
+
+@pytest.mark.django_db
+def test_stream_view_without_asgi(client, post_with_published_location):
+    post = post_with_published_location
+    response = client.get(f'/posts/{post.id}/comments/stream/')
+    assert response.status_code == 204
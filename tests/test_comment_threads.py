@@ -0,0 +1,196 @@
+import pytest
+from blog.models import (COMMENT_PATH_STEP, MAX_COMMENT_DEPTH, Comment,
+                         CommentStatus)
+from blog.views import PAGINATION_OF_COMMENTS
+from bs4 import BeautifulSoup
+
+
+def comment_ids(content):
+    soup = BeautifulSoup(content.decode('utf-8'), features='html.parser')
+    return [
+        int(anchor['name'].removeprefix('comment_'))
+        for anchor in soup.select('a[name^=comment_]')
+    ], soup.select_one('[data-fragment-url]')
+
+
+def reply(comment, text='Ответ'):
+    return Comment.objects.create(
+        post=comment.post, author=comment.author, parent=comment, text=text
+    )
+
+
+@pytest.fixture
+def root_comments(mixer, post_with_published_location, user):
+    return mixer.cycle(PAGINATION_OF_COMMENTS + 2).blend(
+        'blog.Comment', post=post_with_published_location, author=user
+    )
+
+
+@pytest.mark.django_db
+def test_reply_path_extends_parent(root_comments):
+    parent = root_comments[0]
+    child = reply(parent)
+    assert child.path.startswith(parent.path), (
+        "Убедитесь, что путь ответа начинается с пути родителя."
+    )
+    assert len(child.path) == 2 * COMMENT_PATH_STEP
+    assert child.depth == 1 and parent.depth == 0
+    child.refresh_from_db()
+    assert child.path.startswith(parent.path), (
+        "Убедитесь, что путь ответа сохраняется в базе."
+    )
+
+
+@pytest.mark.django_db
+def test_reply_depth_capped(root_comments):
+    comment = root_comments[0]
+    for _ in range(MAX_COMMENT_DEPTH + 2):
+        comment = reply(comment)
+    assert comment.depth == MAX_COMMENT_DEPTH - 1, (
+        "Убедитесь, что глубина веток ограничена MAX_COMMENT_DEPTH."
+    )
+    assert len(comment.path) <= Comment._meta.get_field('path').max_length
+
+
+@pytest.mark.django_db
+def test_thread_rendered_under_root(
+        client, root_comments, django_assert_num_queries
+):
+    first, second = root_comments[:2]
+    child = reply(first)
+    grandchild = reply(child)
+    late = reply(second)
+    post = first.post
+    ids, more = comment_ids(client.get(f'/posts/{post.id}/').content)
+    expected = [first.id, child.id, grandchild.id, second.id, late.id]
+    assert ids[:5] == expected, (
+        "Убедитесь, что ответы выводятся сразу под своими комментариями."
+    )
+    assert len([pk for pk in ids if pk in {
+        comment.id for comment in root_comments
+    }]) == PAGINATION_OF_COMMENTS, (
+        "Убедитесь, что на странице выводится PAGINATION_OF_COMMENTS веток"
+        " верхнего уровня вместе с ответами."
+    )
+    with django_assert_num_queries(2):
+        response = client.get(more['data-fragment-url'])
+    rest, more = comment_ids(response.content)
+    assert rest == [
+        comment.id for comment in root_comments[PAGINATION_OF_COMMENTS:]
+    ], "Убедитесь, что фрагмент возвращает следующие ветки."
+    assert more is None
+
+
+@pytest.mark.django_db
+def test_thread_page_continues_after_replies(client, root_comments):
+    post = root_comments[0].post
+    last = root_comments[PAGINATION_OF_COMMENTS - 1]
+    late = reply(last)
+    ids, more = comment_ids(client.get(f'/posts/{post.id}/').content)
+    assert ids[-2:] == [last.id, late.id]
+    rest, _ = comment_ids(client.get(more['data-fragment-url']).content)
+    assert late.id not in rest, (
+        "Убедитесь, что ответы из предыдущей страницы не повторяются."
+    )
+
+
+@pytest.mark.django_db
+def test_reply_posted_through_form(user_client, root_comments):
+    parent = root_comments[0]
+    post = parent.post
+    response = user_client.get(f'/posts/{post.id}/?reply_to={parent.id}')
+    assert f'name="parent" value="{parent.id}"' in response.content.decode(
+        'utf-8'
+    ), "Убедитесь, что форма ответа передаёт родительский комментарий."
+    response = user_client.post(f'/posts/{post.id}/comment/', data={
+        'text': 'Ответ через форму', 'parent': parent.id,
+    })
+    assert response.status_code == 302
+    child = Comment.objects.get(text='Ответ через форму')
+    assert child.parent == parent and child.path.startswith(parent.path)
+    response = user_client.post(f'/posts/{post.id}/comment/', data={
+        'text': 'Ответ', 'parent': 'abc',
+    })
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_reply_to_other_post_rejected(
+        user_client, root_comments, mixer, published_category,
+        published_location, user
+):
+    other = mixer.blend(
+        'blog.Post', category=published_category,
+        location=published_location, author=user, is_published=True,
+    )
+    response = user_client.post(f'/posts/{other.id}/comment/', data={
+        'text': 'Ответ', 'parent': root_comments[0].id,
+    })
+    assert response.status_code == 404, (
+        "Убедитесь, что нельзя ответить на комментарий к другому посту."
+    )
+
+
+@pytest.mark.django_db
+def test_parent_delete_keeps_replies(
+        user_client, client, root_comments, another_user
+):
+    parent = root_comments[0]
+    post = parent.post
+    child = Comment.objects.create(
+        post=post, author=another_user, parent=parent, text='Чужой ответ'
+    )
+    response = user_client.post(
+        f'/posts/{post.id}/delete_comment/{parent.id}/'
+    )
+    assert response.status_code == 302
+    assert Comment.objects.filter(id=child.id).exists(), (
+        "Убедитесь, что удаление комментария не удаляет чужие ответы."
+    )
+    parent.refresh_from_db()
+    assert parent.status == CommentStatus.DELETED and not parent.text
+    content = client.get(f'/posts/{post.id}/').content.decode('utf-8')
+    assert 'Комментарий удалён' in content and child.text in content, (
+        "Убедитесь, что на месте удалённого комментария остаётся заглушка."
+    )
+    response = user_client.get(f'/posts/{post.id}/edit_comment/{parent.id}/')
+    assert response.status_code == 404
+    leaf = root_comments[1]
+    user_client.post(f'/posts/{post.id}/delete_comment/{leaf.id}/')
+    assert not Comment.objects.filter(id=leaf.id).exists(), (
+        "Убедитесь, что комментарий без ответов удаляется."
+    )
+
+
+@pytest.mark.django_db
+def test_hidden_root_keeps_replies(client, root_comments, another_user):
+    hidden, leaf = root_comments[:2]
+    post = hidden.post
+    child = Comment.objects.create(
+        post=post, author=another_user, parent=hidden, text='Ответ'
+    )
+    Comment.objects.filter(id__in=[hidden.id, leaf.id]).update(
+        status=CommentStatus.REJECTED
+    )
+    response = client.get(f'/posts/{post.id}/')
+    ids, _ = comment_ids(response.content)
+    assert child.id in ids, (
+        "Убедитесь, что ответы на скрытый комментарий остаются в ветке."
+    )
+    assert hidden.id not in ids and leaf.id not in ids
+    content = response.content.decode('utf-8')
+    assert content.count('Комментарий скрыт') == 1, (
+        "Убедитесь, что заглушка выводится только для скрытых комментариев"
+        " с видимыми ответами."
+    )
+
+
+@pytest.mark.django_db
+def test_non_ascii_digits_in_ids(user_client, root_comments):
+    post = root_comments[0].post
+    response = user_client.get(f'/posts/{post.id}/', {'reply_to': '²'})
+    assert response.status_code == 200
+    response = user_client.post(f'/posts/{post.id}/comment/', data={
+        'text': 'Ответ', 'parent': '²',
+    })
+    assert response.status_code == 404
@@ -0,0 +1,59 @@
+import pytest
+from blog.models import Post
+from blog.paginators import CachedCountPaginator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def count_queries(client, url, **params):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url, params)
+    assert response.status_code == 200
+    return sum('COUNT(' in query['sql'] for query in ctx.captured_queries)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url, params', [
+    ('/', {'page': 2}),
+    ('/search/', {'q': 'а', 'page': 1}),
+])
+def test_page_numbers_count_once(
+        user_client, many_posts_with_published_locations, url, params
+):
+    count_queries(user_client, url, **params)
+    assert count_queries(user_client, url, **params) == 0, (
+        "Убедитесь, что число постов для пагинации берётся из кеша."
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('model', ['post', 'comment'])
+def test_admin_changelist_counts_cached(
+        admin_client, comment_to_a_post, model
+):
+    count_queries(admin_client, f'/admin/blog/{model}/')
+    assert count_queries(admin_client, f'/admin/blog/{model}/') == 0, (
+        "Убедитесь, что список в админке не считает записи при каждом"
+        " открытии."
+    )
+
+
+@pytest.mark.django_db
+def test_count_cached_per_filter(mixer, user, published_category):
+    mixer.cycle(3).blend('blog.Post', author=user, category=published_category)
+    posts = Post.objects.order_by('id')
+    assert CachedCountPaginator(posts, 10).count == 3
+    assert CachedCountPaginator(posts.filter(id=posts[0].id), 10).count == 1
+    assert CachedCountPaginator(posts.none(), 10).count == 0
+
+
+@pytest.mark.django_db
+def test_page_range_elided(mixer, user, published_category):
+    mixer.cycle(30).blend(
+        'blog.Post', author=user, category=published_category
+    )
+    page = CachedCountPaginator(Post.objects.order_by('id'), 1).page(15)
+    page_range = list(page.elided_page_range)
+    assert page.paginator.ELLIPSIS in page_range and len(page_range) < 30, (
+        "Убедитесь, что пагинатор выводит не все номера страниц."
+    )
@@ -0,0 +1,59 @@
+from http import HTTPStatus
+
+import pytest
+from blog.models import Post
+from conftest import N_PER_PAGE
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.mark.django_db
+def test_cursor_pages_walk_the_feed(
+        user_client, many_posts_with_published_locations
+):
+    expected_ids = list(
+        Post.objects.order_by('-pub_date', '-id').values_list('id', flat=True)
+    )
+    seen_ids = []
+    cursors = []
+    url = '/'
+    while url:
+        with CaptureQueriesContext(connection) as ctx:
+            response = user_client.get(url)
+        assert not any(
+            'COUNT(' in query['sql'] for query in ctx.captured_queries
+        ), "Убедитесь, что курсорная пагинация не считает публикации."
+        page_obj = response.context['page_obj']
+        assert len(page_obj) <= N_PER_PAGE
+        seen_ids.extend(post.id for post in page_obj)
+        cursors.append(url)
+        url = (
+            f'/?cursor={page_obj.next_cursor}' if page_obj.has_next() else None
+        )
+    assert seen_ids == expected_ids, (
+        "Убедитесь, что курсорная пагинация выводит все публикации по одному"
+        " разу в порядке «от новых к старым»."
+    )
+
+    page_obj = user_client.get(cursors[-1]).context['page_obj']
+    previous = user_client.get(f'/?cursor={page_obj.previous_cursor}')
+    assert [post.id for post in previous.context['page_obj']] == (
+        expected_ids[:N_PER_PAGE]
+    ), "Убедитесь, что ссылка на предыдущую страницу ведёт назад по ленте."
+
+
+@pytest.mark.django_db
+def test_page_numbers_still_work(
+        user_client, many_posts_with_published_locations
+):
+    response = user_client.get('/?page=2')
+    assert response.status_code == HTTPStatus.OK
+    assert response.context['page_obj'].number == 2, (
+        "Убедитесь, что ссылки вида `?page=N` продолжают работать."
+    )
+
+
+@pytest.mark.django_db
+def test_invalid_cursor_is_not_found(user_client):
+    response = user_client.get('/?cursor=garbage')
+    assert response.status_code == HTTPStatus.NOT_FOUND
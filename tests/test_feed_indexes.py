@@ -0,0 +1,56 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def get_feed_query_plans(client, url):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    assert response.status_code == HTTPStatus.OK, (
+        f"Убедитесь, что страница `{url}` отображается без ошибок."
+    )
+    feed_queries = [
+        query['sql'] for query in ctx.captured_queries
+        if 'FROM "blog_post"' in query['sql'] and 'ORDER BY' in query['sql']
+    ]
+    assert feed_queries, (
+        f"Убедитесь, что страница `{url}` выводит ленту публикаций."
+    )
+    plans = []
+    with connection.cursor() as cursor:
+        for sql in feed_queries:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plans.append('\n'.join(row[-1] for row in cursor.fetchall()))
+    return plans
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    ('client_name', 'url_template', 'index_name'),
+    [
+        ('unlogged_client', '/', 'post_feed_idx'),
+        ('unlogged_client', '/category/{category.slug}/',
+         'post_category_feed_idx'),
+        ('unlogged_client', '/profile/{user.username}/',
+         'post_author_feed_idx'),
+        ('user_client', '/profile/{user.username}/', 'post_author_feed_idx'),
+    ],
+    ids=['index', 'category', 'profile', 'own profile']
+)
+def test_feed_uses_index(
+        request, user, published_category, many_posts_with_published_locations,
+        client_name, url_template, index_name
+):
+    client = request.getfixturevalue(client_name)
+    url = url_template.format(category=published_category, user=user)
+    for plan in get_feed_query_plans(client, url):
+        assert index_name in plan, (
+            f"Убедитесь, что лента на странице `{url}` читается по индексу"
+            f" `{index_name}`. План запроса:\n{plan}"
+        )
+        assert 'TEMP B-TREE' not in plan, (
+            f"Убедитесь, что лента на странице `{url}` не сортируется и не"
+            f" группируется во временном B-дереве. План запроса:\n{plan}"
+        )
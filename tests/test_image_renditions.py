@@ -0,0 +1,226 @@
+from io import BytesIO, StringIO
+
+import pytest
+from blog.images import RENDITION_WIDTHS, get_modern_formats
+from blog.models import ImageJob, Post
+from blog.tasks import RETRY_DELAY, get_posts_to_transcode
+from bs4 import BeautifulSoup
+from django.core.files.images import ImageFile
+from django.core.management import call_command
+from PIL import Image
+
+
+def make_image_file(size, name='big_image.jpg'):
+    image_io = BytesIO()
+    Image.new('RGB', size, color=(73, 109, 137)).save(image_io, 'JPEG')
+    return ImageFile(image_io, name=name)
+
+
+def process_image_jobs(workers=0):
+    call_command('process_image_jobs', once=True, workers=workers,
+                 stdout=StringIO())
+
+
+@pytest.fixture
+def post_with_big_image(mixer, user, published_location, published_category):
+    return mixer.blend(
+        'blog.Post',
+        location=published_location,
+        category=published_category,
+        author=user,
+        image=make_image_file((1000, 500)),
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('workers', [0, 1], ids=['inline', 'process pool'])
+def test_renditions_created(post_with_big_image, workers):
+    post = post_with_big_image
+    process_image_jobs(workers)
+    post.refresh_from_db()
+    renditions = post.image_meta['renditions']
+    expected_widths = [w for w in RENDITION_WIDTHS if w < 1000]
+    assert [int(w) for w in renditions] == expected_widths, (
+        "Убедитесь, что для фото создаются уменьшенные копии всех размеров,"
+        " не превышающих ширину оригинала."
+    )
+    storage = post.image.storage
+    for width, name in renditions.items():
+        with storage.open(name) as rendition_file:
+            with Image.open(rendition_file) as rendition:
+                assert rendition.width == int(width)
+
+
+@pytest.mark.django_db
+def test_feed_serves_renditions(unlogged_client, post_with_big_image):
+    post = post_with_big_image
+    content = unlogged_client.get('/').content.decode('utf-8')
+    assert 'image_placeholder.svg' in content, (
+        "Убедитесь, что до обработки фото в карточке выводится заглушка."
+    )
+    process_image_jobs()
+    post.refresh_from_db()
+    soup = BeautifulSoup(
+        unlogged_client.get('/').content.decode('utf-8'),
+        features='html.parser'
+    )
+    img = soup.find('img', srcset=True)
+    assert img is not None, (
+        "Убедитесь, что карточка публикации выводит фото с атрибутом srcset."
+    )
+    assert img['src'] != post.image.url, (
+        "Убедитесь, что в ленте не выводится оригинал фото."
+    )
+    assert img.find_parent('a')['href'] == post.image.url, (
+        "Убедитесь, что оригинал фото доступен по ссылке с карточки."
+    )
+
+
+@pytest.mark.django_db
+def test_renditions_replaced_with_image(post_with_big_image):
+    post = post_with_big_image
+    process_image_jobs()
+    post.refresh_from_db()
+    old_renditions = list(post.image_meta['renditions'].values())
+    post.image = make_image_file((400, 300), name='small_image.jpg')
+    post.save()
+    process_image_jobs()
+    post.refresh_from_db()
+    assert list(post.image_meta['renditions']) == ['160', '320']
+    for name in old_renditions:
+        assert not post.image.storage.exists(name), (
+            "Убедитесь, что копии прежнего фото удаляются при его замене."
+        )
+
+
+@pytest.mark.django_db
+def test_failed_job_retried_with_backoff(post_with_big_image):
+    post = post_with_big_image
+    post.image.storage.delete(post.image.name)
+    process_image_jobs()
+    job = ImageJob.objects.get(post=post)
+    assert job.status == ImageJob.Status.PENDING and job.attempts == 1, (
+        "Убедитесь, что неудачная обработка фото повторяется позже."
+    )
+    assert job.run_after - job.locked_at >= RETRY_DELAY
+
+    ImageJob.objects.filter(pk=job.pk).update(run_after=job.locked_at)
+    process_image_jobs()
+    job.refresh_from_db()
+    assert job.attempts == 2
+    assert job.run_after - job.locked_at >= RETRY_DELAY * 2, (
+        "Убедитесь, что пауза между повторами растёт."
+    )
+
+
+@pytest.mark.django_db
+def test_renditions_limit_pixels(settings, post_with_big_image):
+    settings.MAX_IMAGE_PIXELS = 1000
+    process_image_jobs()
+    job = ImageJob.objects.get(post=post_with_big_image)
+    assert job.attempts == 1 and 'DecompressionBombError' in job.last_error, (
+        "Убедитесь, что фото больше MAX_IMAGE_PIXELS не декодируются."
+    )
+
+
+@pytest.mark.django_db
+def test_picture_offers_modern_formats(unlogged_client, post_with_big_image):
+    process_image_jobs()
+    soup = BeautifulSoup(
+        unlogged_client.get('/').content.decode('utf-8'),
+        features='html.parser'
+    )
+    types = [
+        source['type'] for source in soup.select('picture source[srcset]')
+    ]
+    assert types == [
+        f'image/{extension}' for _, extension in get_modern_formats()
+    ], (
+        "Убедитесь, что фото выводится в <picture> с вариантами во всех"
+        " поддерживаемых современных форматах."
+    )
+    assert soup.select_one('picture img[srcset]') is not None, (
+        "Убедитесь, что внутри <picture> остаётся <img> с копиями в JPEG."
+    )
+
+
+@pytest.mark.django_db
+def test_transcode_images_backfills_sources(post_with_big_image):
+    post = post_with_big_image
+    process_image_jobs()
+    post.refresh_from_db()
+    legacy_meta = {
+        key: value for key, value in post.image_meta.items()
+        if key != 'sources'
+    }
+    Post.objects.filter(pk=post.pk).update(image_meta=legacy_meta)
+    for widths in post.image_meta['sources'].values():
+        for name in widths.values():
+            post.image.storage.delete(name)
+
+    out = StringIO()
+    call_command('transcode_images', workers=0, stdout=out)
+    assert 'Обработано 1 из 1' in out.getvalue()
+    post.refresh_from_db()
+    assert set(post.image_meta['sources']) == {
+        extension for _, extension in get_modern_formats()
+    }, "Убедитесь, что команда создаёт копии в современных форматах."
+    assert post.image_meta['renditions'] == legacy_meta['renditions'], (
+        "Убедитесь, что копии с прежним содержимым не дублируются."
+    )
+    for widths in post.image_meta['sources'].values():
+        for name in widths.values():
+            assert post.image.storage.exists(name)
+
+    out = StringIO()
+    call_command('transcode_images', workers=0, stdout=out)
+    assert 'Обновлено фото: 0' in out.getvalue(), (
+        "Убедитесь, что повторный запуск пропускает обработанные посты."
+    )
+
+
+@pytest.mark.django_db
+def test_transcode_images_without_meta(post_with_big_image):
+    post = post_with_big_image
+    assert not get_posts_to_transcode().exists(), (
+        "Убедитесь, что фото в очереди не обрабатываются командой."
+    )
+    Post.objects.filter(pk=post.pk).update(image_meta={})
+    out = StringIO()
+    call_command('transcode_images', workers=0, stdout=out)
+    assert 'Обновлено фото: 1' in out.getvalue(), (
+        "Убедитесь, что команда обрабатывает фото без сведений о копиях."
+    )
+    post.refresh_from_db()
+    assert post.image_meta['source'] == post.image.name
+    assert post.image_meta['renditions'] and post.image_meta['lqip']
+    assert post.image.storage.exists(post.image.name)
+
+
+@pytest.mark.django_db
+def test_images_reserve_space_and_load_lazily(
+        user_client, post_with_big_image
+):
+    post = post_with_big_image
+    post.refresh_from_db()
+    placeholder = BeautifulSoup(
+        user_client.get('/').content.decode('utf-8'),
+        features='html.parser'
+    ).find('img', src=lambda src: 'image_placeholder.svg' in src)
+    assert (placeholder['width'], placeholder['height']) == ('1000', '500'), (
+        "Убедитесь, что размеры фото известны сразу после загрузки."
+    )
+
+    process_image_jobs()
+    for url in ('/', f'/posts/{post.id}/'):
+        img = BeautifulSoup(
+            user_client.get(url).content.decode('utf-8'),
+            features='html.parser'
+        ).find('img', srcset=True)
+        assert (img['width'], img['height']) == ('1000', '500'), (
+            "Убедитесь, что у фото указаны ширина и высота."
+        )
+        assert img['loading'] == 'lazy' and img['decoding'] == 'async'
+        assert 'data:image/jpeg;base64,' in img['style'], (
+            "Убедитесь, что до загрузки фото выводится его размытая копия."
+        )
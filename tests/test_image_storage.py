@@ -0,0 +1,108 @@
+from io import StringIO
+
+import pytest
+from blog.storage import IMMUTABLE_CACHE_CONTROL, is_content_addressed
+from django.core.management import call_command
+from test_image_renditions import make_image_file
+
+
+def blend_post(mixer, user, category, image):
+    return mixer.blend(
+        'blog.Post', author=user, category=category, image=image
+    )
+
+
+def rendition_names(post):
+    post.refresh_from_db()
+    names = set(post.image_meta['renditions'].values())
+    for widths in post.image_meta['sources'].values():
+        names.update(widths.values())
+    return names
+
+
+@pytest.mark.django_db
+def test_identical_uploads_share_file(mixer, user, published_category):
+    first = blend_post(
+        mixer, user, published_category, make_image_file((400, 300))
+    )
+    second = blend_post(
+        mixer, user, published_category,
+        make_image_file((400, 300), name='copy.JPG')
+    )
+    assert is_content_addressed(first.image.name), (
+        "Убедитесь, что фото именуются по хешу содержимого."
+    )
+    assert first.image.name == second.image.name, (
+        "Убедитесь, что одинаковые загрузки хранятся в одном файле."
+    )
+
+
+@pytest.mark.django_db
+def test_shared_image_deleted_with_last_post(
+        mixer, user, published_category
+):
+    first = blend_post(
+        mixer, user, published_category, make_image_file((400, 300))
+    )
+    second = blend_post(
+        mixer, user, published_category, make_image_file((400, 300))
+    )
+    call_command('process_image_jobs', once=True, workers=0,
+                 stdout=StringIO())
+    storage = first.image.storage
+    names = {first.image.name} | rendition_names(first)
+    second.refresh_from_db()
+
+    first.delete()
+    assert all(storage.exists(name) for name in names), (
+        "Убедитесь, что фото не удаляется, пока его использует другой пост."
+    )
+    second.delete()
+    assert not any(storage.exists(name) for name in names), (
+        "Убедитесь, что фото и его копии удаляются вместе с последним"
+        " использующим их постом."
+    )
+
+
+@pytest.mark.django_db
+def test_replaced_image_collected(
+        user_client, mixer, user, published_category
+):
+    post = blend_post(
+        mixer, user, published_category, make_image_file((400, 300))
+    )
+    storage = post.image.storage
+    old_name = post.image.name
+    new_image = make_image_file((300, 200), name='new.jpg')
+    new_image.seek(0)
+    response = user_client.post(
+        f'/posts/{post.id}/edit/',
+        data={
+            'title': post.title,
+            'text': post.text,
+            'pub_date': post.pub_date.strftime('%Y-%m-%dT%H:%M'),
+            'category': published_category.id,
+            'image': new_image,
+        },
+    )
+    assert response.status_code == 302
+    post.refresh_from_db()
+    assert post.image.name != old_name
+    assert not storage.exists(old_name), (
+        "Убедитесь, что заменённое фото удаляется, если больше"
+        " не используется."
+    )
+
+
+@pytest.mark.django_db
+def test_hashed_media_cached_forever(
+        client, mixer, user, published_category
+):
+    post = blend_post(
+        mixer, user, published_category, make_image_file((400, 300))
+    )
+    response = client.get(post.image.url)
+    assert response['Cache-Control'] == IMMUTABLE_CACHE_CONTROL, (
+        "Убедитесь, что фото с именем по хешу отдаются с заголовком"
+        " неизменяемого кеширования."
+    )
@@ -0,0 +1,89 @@
+from http import HTTPStatus
+
+import pytest
+from blog.storage import ContentAddressedStorage
+from django.core.files.base import ContentFile
+
+CONTENT = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def media_file():
+    storage = ContentAddressedStorage()
+    name = storage.save('post_images/data.jpg', ContentFile(CONTENT))
+    yield name
+    storage.delete(name)
+
+
+def read(response):
+    return b''.join(response.streaming_content)
+
+
+def test_file_served(client, media_file):
+    response = client.get(f'/media/{media_file}')
+    assert response.status_code == HTTPStatus.OK
+    assert read(response) == CONTENT
+    assert response['Content-Type'] == 'image/jpeg'
+    assert response['Accept-Ranges'] == 'bytes'
+
+
+def test_range_served(client, media_file):
+    response = client.get(f'/media/{media_file}', HTTP_RANGE='bytes=10-19')
+    assert response.status_code == HTTPStatus.PARTIAL_CONTENT, (
+        "Убедитесь, что медиафайлы отдаются по частям в ответ на Range."
+    )
+    assert read(response) == CONTENT[10:20]
+    assert response['Content-Range'] == f'bytes 10-19/{len(CONTENT)}'
+    assert response['Content-Length'] == '10'
+
+    response = client.get(f'/media/{media_file}', HTTP_RANGE='bytes=-5')
+    assert read(response) == CONTENT[-5:]
+
+
+def test_range_not_satisfiable(client, media_file):
+    response = client.get(
+        f'/media/{media_file}', HTTP_RANGE=f'bytes={len(CONTENT)}-'
+    )
+    assert response.status_code == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+
+
+def test_stale_if_range_gets_full_file(client, media_file):
+    response = client.get(
+        f'/media/{media_file}', HTTP_RANGE='bytes=10-19',
+        HTTP_IF_RANGE='"stale"'
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert read(response) == CONTENT
+
+
+def test_conditional_request(client, media_file):
+    etag = client.get(f'/media/{media_file}')['ETag']
+    response = client.get(f'/media/{media_file}', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+        "Убедитесь, что медиафайлы поддерживают условные запросы."
+    )
+
+
+@pytest.mark.parametrize('mode, header', [
+    ('x-accel-redirect', 'X-Accel-Redirect'),
+    ('x-sendfile', 'X-Sendfile'),
+])
+def test_transfer_delegated_to_proxy(
+        settings, client, media_file, mode, header
+):
+    settings.MEDIA_SERVE_MODE = mode
+    response = client.get(f'/media/{media_file}')
+    assert response.status_code == HTTPStatus.OK
+    assert header in response, (
+        "Убедитесь, что передачу файла можно поручить фронт-серверу."
+    )
+    assert response.content == b''
+    if mode == 'x-accel-redirect':
+        assert response[header] == (
+            settings.MEDIA_ACCEL_REDIRECT_LOCATION + media_file
+        )
+
+
+@pytest.mark.parametrize('path', ['../manage.py', 'post_images/missing.jpg'])
+def test_missing_or_outside_media_not_found(client, path):
+    assert client.get(f'/media/{path}').status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,126 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from blog.views import HomeListView
+from django.test import RequestFactory
+from django.utils import timezone
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', ['/', '/pages/about/', '/pages/rules/'])
+def test_anonymous_pages_cached(
+        unlogged_client, post_with_published_location,
+        django_assert_num_queries, url
+):
+    unlogged_client.get(url)
+    with django_assert_num_queries(0):
+        response = unlogged_client.get(url)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_authorised_pages_not_cached(
+        user, user_client, post_with_published_location
+):
+    user_client.get('/')
+    response = user_client.get('/')
+    assert response.context is not None, (
+        "Убедитесь, что авторизованному пользователю страница не отдаётся"
+        " из кеша."
+    )
+    assert user.username in response.content.decode('utf-8')
+
+
+@pytest.mark.django_db
+def test_only_affected_feeds_invalidated(
+        mixer, user, unlogged_client, published_category, another_category,
+        post_with_published_location, post_with_another_category
+):
+    urls = {
+        'index': '/',
+        'category': f'/category/{published_category.slug}/',
+        'another_category': f'/category/{another_category.slug}/',
+        'profile': f'/profile/{user.username}/',
+    }
+    for url in urls.values():
+        unlogged_client.get(url)
+
+    mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        title='Свежая публикация'
+    )
+    for name in ('index', 'category', 'profile'):
+        content = unlogged_client.get(urls[name]).content.decode('utf-8')
+        assert 'Свежая публикация' in content, (
+            "Убедитесь, что новая публикация сбрасывает кеш лент, в которых"
+            " она выводится."
+        )
+    response = unlogged_client.get(urls['another_category'])
+    assert response.context is None, (
+        "Убедитесь, что публикация не сбрасывает кеш лент других категорий."
+    )
+
+
+@pytest.mark.django_db
+def test_profile_edit_invalidates_profile_page(
+        user, user_client, unlogged_client, django_assert_num_queries
+):
+    url = f'/profile/{user.username}/'
+    unlogged_client.get(url)
+    response = user_client.post('/edit_profile/', data={
+        'first_name': 'Новое', 'last_name': 'Имя',
+        'username': user.username, 'email': 'new@example.com',
+    })
+    assert response.status_code == 302
+    content = unlogged_client.get(url).content.decode('utf-8')
+    assert 'Новое Имя' in content, (
+        "Убедитесь, что изменение имени сбрасывает кеш страницы профиля."
+    )
+    user.is_staff = True
+    user.save()
+    assert 'Админ' in unlogged_client.get(url).content.decode('utf-8')
+    unlogged_client.get(url)
+    user.save(update_fields=['last_login'])
+    with django_assert_num_queries(0):
+        unlogged_client.get(url)
+
+
+@pytest.mark.django_db
+def test_cache_expires_with_scheduled_post(
+        mixer, user, published_category, post_with_published_location
+):
+    pub_date = timezone.now() + timedelta(minutes=1)
+    mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        pub_date=pub_date
+    )
+    view = HomeListView()
+    view.setup(RequestFactory().get('/'))
+    assert 0 < view.get_page_cache_timeout() <= 60, (
+        "Убедитесь, что кеш ленты истекает к моменту публикации ближайшего"
+        " отложенного поста."
+    )
+
+
+@pytest.mark.django_db
+def test_scheduled_post_appears_in_cached_feed(
+        mixer, user, unlogged_client, published_category,
+        post_with_published_location, django_assert_num_queries
+):
+    now = timezone.now()
+    mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        pub_date=now + timedelta(minutes=1), title='Отложенная публикация'
+    )
+    unlogged_client.get('/')
+    with django_assert_num_queries(0):
+        unlogged_client.get('/')
+    with mock.patch(
+        'django.utils.timezone.now', return_value=now + timedelta(minutes=2)
+    ):
+        content = unlogged_client.get('/').content.decode('utf-8')
+    assert 'Отложенная публикация' in content, (
+        "Убедитесь, что отложенная публикация появляется в закешированной"
+        " ленте сразу после наступления даты публикации."
+    )
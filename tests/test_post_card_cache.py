@@ -0,0 +1,57 @@
+import pytest
+
+
+@pytest.mark.django_db
+def test_post_card_cached_until_post_changes(
+        unlogged_client, post_with_published_location
+):
+    post = post_with_published_location
+    unlogged_client.get('/')
+    type(post).objects.filter(pk=post.pk).update(title='Без новой версии')
+    content = unlogged_client.get('/').content.decode('utf-8')
+    assert 'Без новой версии' not in content, (
+        "Убедитесь, что карточка публикации берётся из кеша, пока публикация"
+        " не изменилась."
+    )
+    post.refresh_from_db()
+    post.save()
+    content = unlogged_client.get('/').content.decode('utf-8')
+    assert 'Без новой версии' in content, (
+        "Убедитесь, что кеш карточки сбрасывается при изменении публикации."
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    ('related', 'field', 'value'),
+    [
+        ('category', 'title', 'Новая категория'),
+        ('location', 'name', 'Новое место'),
+        ('author', 'username', 'new_author_name'),
+    ]
+)
+def test_post_card_follows_related_objects(
+        unlogged_client, post_with_published_location, related, field, value
+):
+    post = post_with_published_location
+    unlogged_client.get('/')
+    related_object = getattr(post, related)
+    setattr(related_object, field, value)
+    related_object.save()
+    content = unlogged_client.get('/').content.decode('utf-8')
+    assert value in content, (
+        "Убедитесь, что кеш карточки публикации сбрасывается при изменении"
+        " её категории, местоположения или автора."
+    )
+
+
+@pytest.mark.usefixtures('score_comments_eagerly')
+@pytest.mark.django_db
+def test_post_card_follows_comment_count(
+        user_client, post_with_published_location
+):
+    post = post_with_published_location
+    user_client.get('/')
+    user_client.post(f'/posts/{post.id}/comment/', data={'text': 'Текст'})
+    content = user_client.get('/').content.decode('utf-8')
+    assert 'Комментарии (1)' in content
@@ -0,0 +1,42 @@
+from http import HTTPStatus
+
+import pytest
+from conftest import N_PER_FIXTURE
+
+DETAIL_QUERIES = 2  # публикация, комментарии с авторами
+AUTHORISED_DETAIL_QUERIES = DETAIL_QUERIES + 2  # сессия, пользователь
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('n_comments', [0, N_PER_FIXTURE])
+def test_post_detail_query_count(
+        mixer, user_client, unlogged_client, post_with_published_location,
+        django_assert_num_queries, n_comments
+):
+    post = post_with_published_location
+    mixer.cycle(n_comments).blend('blog.Comment', post=post)
+    url = f'/posts/{post.id}/'
+    with django_assert_num_queries(DETAIL_QUERIES):
+        response = unlogged_client.get(url)
+    assert len(response.context['comments']) == n_comments
+    with django_assert_num_queries(AUTHORISED_DETAIL_QUERIES):
+        user_client.get(url)
+
+
+@pytest.mark.django_db
+def test_hidden_post_visible_to_author_only(
+        mixer, user_client, another_user_client, unlogged_client,
+        post_with_published_location
+):
+    post = post_with_published_location
+    post.category = mixer.blend('blog.Category', is_published=False)
+    post.save()
+    url = f'/posts/{post.id}/'
+    assert user_client.get(url).status_code == HTTPStatus.OK, (
+        "Убедитесь, что автор видит свою публикацию в снятой с публикации категории."
+    )
+    for client in (another_user_client, unlogged_client):
+        assert client.get(url).status_code == HTTPStatus.NOT_FOUND, (
+            "Убедитесь, что публикация в снятой с публикации категории"
+            " недоступна другим пользователям."
+        )
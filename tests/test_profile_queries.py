@@ -0,0 +1,26 @@
+import pytest
+
+PROFILE_QUERIES = 2  # автор, публикации
+SCHEDULE_QUERIES = 1  # ближайшая отложенная публикация, до сброса кеша
+OWN_PROFILE_QUERIES = 3  # сессия, текущий пользователь, публикации
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'posts_fixture',
+    ['post_with_published_location', 'many_posts_with_published_locations'],
+    ids=['one post', 'several pages']
+)
+def test_profile_query_count(
+        request, user, unlogged_client, user_client,
+        django_assert_num_queries, posts_fixture
+):
+    request.getfixturevalue(posts_fixture)
+    url = f'/profile/{user.username}/'
+    with django_assert_num_queries(PROFILE_QUERIES + SCHEDULE_QUERIES):
+        page_obj = unlogged_client.get(url).context['page_obj']
+    if page_obj.has_next():
+        with django_assert_num_queries(PROFILE_QUERIES):
+            unlogged_client.get(f'{url}?cursor={page_obj.next_cursor}')
+    with django_assert_num_queries(OWN_PROFILE_QUERIES):
+        user_client.get(url)
@@ -0,0 +1,138 @@
+import pytest
+from blog.ratelimit import _buckets, consume, take_token
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+User = get_user_model()
+
+
+def test_bucket_refills_over_time():
+    bucket, wait = take_token(None, 2, 60, 0)
+    bucket, wait = take_token(bucket, 2, 60, 0)
+    assert wait == 0
+    bucket, wait = take_token(bucket, 2, 60, 0)
+    assert wait == pytest.approx(30), (
+        "Убедитесь, что без жетонов возвращается время до следующего."
+    )
+    _, wait = take_token(bucket, 2, 60, 30)
+    assert wait == 0, "Убедитесь, что корзина наполняется со временем."
+
+
+def test_token_taken_only_if_all_buckets_allow():
+    assert consume({'a': (1, 60)}) == 0
+    assert consume({'b': (1, 60), 'a': (1, 60)}) > 0
+    assert consume({'b': (1, 60)}) == 0, (
+        "Убедитесь, что при отказе жетон не списывается из других корзин."
+    )
+
+
+def test_memory_fallback(monkeypatch):
+    def broken(*args, **kwargs):
+        raise ConnectionError
+
+    monkeypatch.setattr(cache, 'get_many', broken)
+    assert consume({'key': (1, 60)}) == 0
+    assert consume({'key': (1, 60)}) > 0, (
+        "Убедитесь, что без кеша лимит действует по памяти процесса."
+    )
+    assert 'key' in _buckets
+
+
+@pytest.mark.django_db
+def test_comment_rate_limited(
+        settings, user_client, post_with_published_location,
+        django_assert_num_queries
+):
+    settings.RATE_LIMITS = {'comment': '2/m'}
+    post = post_with_published_location
+    url = f'/posts/{post.id}/comment/'
+    for _ in range(2):
+        assert user_client.post(url, data={'text': 'Текст'}).status_code == 302
+    with django_assert_num_queries(2):
+        response = user_client.post(url, data={'text': 'Текст'})
+    assert response.status_code == 429, (
+        "Убедитесь, что сверх лимита возвращается статус 429."
+    )
+    assert 0 < int(response['Retry-After']) <= 30
+    assert post.comments.count() == 2
+
+
+@pytest.mark.django_db
+def test_limit_applies_per_ip(
+        settings, client, user_client, another_user_client,
+        post_with_published_location
+):
+    settings.RATE_LIMITS_PER_IP = {'comment': '1/m'}
+    post = post_with_published_location
+    url = f'/posts/{post.id}/comment/'
+    assert user_client.post(url, data={'text': 'Текст'}).status_code == 302
+    response = another_user_client.post(url, data={'text': 'Текст'})
+    assert response.status_code == 429, (
+        "Убедитесь, что лимит действует и на IP-адрес."
+    )
+    response = another_user_client.post(
+        url, data={'text': 'Текст'}, REMOTE_ADDR='10.0.0.2'
+    )
+    assert response.status_code == 302
+    assert client.get(url).status_code == 302, (
+        "Убедитесь, что лимит не затрагивает GET-запросы."
+    )
+
+
+@pytest.mark.django_db
+def test_users_behind_one_address(
+        settings, mixer, client, post_with_published_location
+):
+    settings.RATE_LIMITS = {'comment': '1/m'}
+    settings.RATE_LIMITS_PER_IP = {'comment': '100/m'}
+    url = f'/posts/{post_with_published_location.id}/comment/'
+    for user in mixer.cycle(11).blend(User):
+        client.force_login(user)
+        response = client.post(url, data={'text': 'Текст'})
+        assert response.status_code == 302, (
+            "Убедитесь, что пользователи за одним адресом не делят"
+            " пользовательский лимит."
+        )
+    assert client.post(url, data={'text': 'Текст'}).status_code == 429
+
+
+@pytest.mark.django_db
+def test_client_ip_from_trusted_header(
+        settings, user_client, another_user_client,
+        post_with_published_location
+):
+    settings.RATE_LIMITS_PER_IP = {'comment': '1/m'}
+    settings.RATE_LIMIT_IP_HEADER = 'HTTP_X_FORWARDED_FOR'
+    url = f'/posts/{post_with_published_location.id}/comment/'
+    response = user_client.post(
+        url, data={'text': 'Текст'}, HTTP_X_FORWARDED_FOR='1.1.1.1, 10.0.0.1'
+    )
+    assert response.status_code == 302
+    response = another_user_client.post(
+        url, data={'text': 'Текст'}, HTTP_X_FORWARDED_FOR='10.0.0.2'
+    )
+    assert response.status_code == 302, (
+        "Убедитесь, что адрес клиента берётся из заголовка прокси."
+    )
+    response = another_user_client.post(
+        url, data={'text': 'Текст'}, HTTP_X_FORWARDED_FOR='2.2.2.2, 10.0.0.1'
+    )
+    assert response.status_code == 429, (
+        "Убедитесь, что берётся последний адрес из заголовка: остальные"
+        " может подставить клиент."
+    )
+
+
+@pytest.mark.django_db
+def test_post_create_rate_limited(settings, user_client, published_category):
+    settings.RATE_LIMITS = {'post': '1/h'}
+    data = {
+        'title': 'Заголовок',
+        'text': 'Текст',
+        'pub_date': '2020-01-01T00:00',
+        'category': published_category.id,
+    }
+    assert user_client.post('/posts/create/', data=data).status_code == 302
+    response = user_client.post('/posts/create/', data=data)
+    assert response.status_code == 429
+    assert int(response['Retry-After']) == 3600
@@ -0,0 +1,80 @@
+from io import StringIO
+
+import pytest
+from blog.models import Post
+from bs4 import BeautifulSoup
+from django.core.management import call_command
+
+
+def search(client, query, **params):
+    return client.get('/search/', {'q': query, **params})
+
+
+def found_ids(response):
+    return [post.id for post in response.context['page_obj']]
+
+
+@pytest.fixture
+def searchable_posts(mixer, user, published_category, published_location):
+    def blend(title, text, **kwargs):
+        return mixer.blend(
+            'blog.Post', author=user, category=published_category,
+            location=published_location, title=title, text=text, **kwargs
+        )
+    return {
+        'title': blend('Путешествие на Байкал', 'Заметки с дороги'),
+        'text': blend('Заметки', 'Зимой на Байкале прозрачный лёд'),
+        'other': blend('Рецепт пирога', 'Мука, яйца и сахар'),
+        'hidden': blend('Байкал', 'Черновик', is_published=False),
+    }
+
+
+@pytest.mark.django_db
+def test_search_ranks_visible_posts(user_client, searchable_posts):
+    response = search(user_client, 'байкал')
+    assert found_ids(response) == [
+        searchable_posts['title'].id, searchable_posts['text'].id
+    ], (
+        "Убедитесь, что поиск находит опубликованные посты по заголовку и"
+        " тексту, и совпадения в заголовке выводятся выше."
+    )
+
+
+@pytest.mark.django_db
+def test_search_highlights_snippet(user_client, searchable_posts):
+    soup = BeautifulSoup(
+        search(user_client, 'лёд').content.decode('utf-8'),
+        features='html.parser'
+    )
+    marks = [mark.text for mark in soup.find_all('mark')]
+    assert marks == ['лёд'], (
+        "Убедитесь, что в результатах поиска совпадения подсвечены."
+    )
+
+
+@pytest.mark.django_db
+def test_search_index_follows_changes(user_client, searchable_posts):
+    post = searchable_posts['other']
+    post.title = 'Пирог с Байкала'
+    post.save()
+    assert post.id in found_ids(search(user_client, 'байкал')), (
+        "Убедитесь, что индекс обновляется при изменении поста."
+    )
+    Post.objects.filter(pk=post.pk).update(text='Облепиха')
+    assert post.id in found_ids(search(user_client, 'облепиха'))
+    post.delete()
+    assert post.id not in found_ids(search(user_client, 'байкал'))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query', ['', '"', 'AND OR NOT', 'title:*'])
+def test_search_tolerates_any_input(user_client, searchable_posts, query):
+    assert search(user_client, query).status_code == 200
+
+
+@pytest.mark.django_db
+def test_rebuild_search_index(user_client, searchable_posts):
+    out = StringIO()
+    call_command('rebuild_search_index', stdout=out)
+    assert 'Проиндексировано публикаций: 4' in out.getvalue()
+    assert len(found_ids(search(user_client, 'байкал'))) == 2
@@ -0,0 +1,231 @@
+import pytest
+from blog.live import broker
+from blog.models import Comment, CommentStatus
+from blog.spam import (duplicate_score, heuristic_score, link_score,
+                       process_comment_scores)
+from django.core.management import call_command
+
+SPAM_TEXT = 'Лучшие цены на всё только сегодня заходите на наш сайт скорее'
+
+
+def make_comment(post, author, text):
+    return Comment.objects.create(
+        post=post, author=author, text=text, status=CommentStatus.NEW
+    )
+
+
+def test_heuristics():
+    comments = [
+        Comment(text='ОЧЕНЬ ВАЖНОЕ СООБЩЕНИЕ ДЛЯ ВСЕХ ЧИТАТЕЛЕЙ'),
+        Comment(text='Ураааааааааааа'),
+        Comment(text='Обычный комментарий'),
+    ]
+    assert heuristic_score(comments) == [0.5, 0.5, 0.0]
+
+
+def test_link_score():
+    comments = [
+        Comment(text='без ссылок'),
+        Comment(text='см. https://example.com'),
+        Comment(text='http://a.ru http://b.ru www.c.ru'),
+    ]
+    assert link_score(comments) == pytest.approx([0.0, 0.4, 1.0])
+
+
+@pytest.mark.django_db
+def test_duplicate_detected_by_shingles(
+        post_with_published_location, user, another_user
+):
+    post = post_with_published_location
+    original = make_comment(post, another_user, SPAM_TEXT)
+    copy = make_comment(post, user, SPAM_TEXT.upper() + '!')
+    other = make_comment(post, user, 'Спасибо за интересный рассказ')
+    assert duplicate_score([original, copy, other]) == [0.0, 1.0, 0.0], (
+        "Убедитесь, что копией считается только более поздний из двух"
+        " почти одинаковых комментариев."
+    )
+
+
+@pytest.mark.django_db
+def test_pipeline_holds_suspicious(
+        post_with_published_location, user, client
+):
+    post = post_with_published_location
+    clean = make_comment(post, user, 'Спасибо за интересный рассказ')
+    spam = make_comment(
+        post, user, 'КУПИ СЕЙЧАС http://a.ru http://b.ru http://c.ru'
+    )
+    post.refresh_from_db()
+    assert post.comment_count == 0, (
+        "Убедитесь, что непроверенные комментарии не учитываются в счётчике."
+    )
+    content = client.get(f'/posts/{post.id}/').content.decode('utf-8')
+    assert clean.text not in content, (
+        "Убедитесь, что непроверенные комментарии скрыты от читателей."
+    )
+    assert process_comment_scores(10) == 2
+    clean.refresh_from_db()
+    spam.refresh_from_db()
+    assert clean.status == CommentStatus.APPROVED
+    assert spam.status == CommentStatus.PENDING, (
+        "Убедитесь, что подозрительные комментарии уходят на модерацию."
+    )
+    assert spam.spam_score >= 1
+    post.refresh_from_db()
+    assert post.comment_count == 1, (
+        "Убедитесь, что скрытые комментарии не учитываются в счётчике."
+    )
+    content = client.get(f'/posts/{post.id}/').content.decode('utf-8')
+    assert clean.text in content
+    assert 'http://a.ru' not in content, (
+        "Убедитесь, что комментарии на модерации скрыты от читателей."
+    )
+    assert process_comment_scores(10) == 0
+
+
+@pytest.mark.django_db
+def test_form_comment_waits_for_scoring(
+        user_client, client, post_with_published_location
+):
+    post = post_with_published_location
+    user_client.post(f'/posts/{post.id}/comment/', data={'text': 'Из формы'})
+    comment = Comment.objects.get(text='Из формы')
+    assert comment.status == CommentStatus.NEW, (
+        "Убедитесь, что по умолчанию комментарий из формы ждёт проверки."
+    )
+    post.refresh_from_db()
+    assert post.comment_count == 0
+    assert comment.text not in client.get(f'/posts/{post.id}/').content.decode(
+        'utf-8'
+    )
+    assert comment.text in user_client.get(
+        f'/posts/{post.id}/'
+    ).content.decode('utf-8')
+    process_comment_scores(10)
+    post.refresh_from_db()
+    assert post.comment_count == 1
+    assert comment.text in client.get(f'/posts/{post.id}/').content.decode(
+        'utf-8'
+    ), "Убедитесь, что после проверки комментарий виден всем."
+
+
+@pytest.mark.django_db
+def test_author_sees_own_held_comment(
+        post_with_published_location, user, user_client
+):
+    post = post_with_published_location
+    new = make_comment(post, user, 'Текст до проверки')
+    held = make_comment(post, user, 'Текст на проверке')
+    Comment.objects.filter(pk=held.pk).update(status=CommentStatus.PENDING)
+    content = user_client.get(f'/posts/{post.id}/').content.decode('utf-8')
+    assert new.text in content and held.text in content
+    assert 'Не проверен' in content and 'На модерации' in content
+
+
+@pytest.mark.django_db
+def test_edited_comment_scored_again(
+        post_with_published_location, user, user_client
+):
+    post = post_with_published_location
+    comment = make_comment(post, user, 'Спасибо за рассказ')
+    process_comment_scores(10)
+    post.refresh_from_db()
+    assert post.comment_count == 1
+    user_client.post(
+        f'/posts/{post.id}/edit_comment/{comment.id}/',
+        data={'text': 'http://a.ru http://b.ru http://c.ru'},
+    )
+    comment.refresh_from_db()
+    assert comment.status == CommentStatus.NEW, (
+        "Убедитесь, что изменённый комментарий проверяется заново."
+    )
+    post.refresh_from_db()
+    assert post.comment_count == 0
+    process_comment_scores(10)
+    comment.refresh_from_db()
+    assert comment.status == CommentStatus.PENDING
+
+
+@pytest.mark.django_db
+def test_published_only_after_approval(
+        user_client, post_with_published_location,
+        django_capture_on_commit_callbacks, monkeypatch
+):
+    post = post_with_published_location
+    published = []
+    monkeypatch.setattr(
+        broker, 'publish',
+        lambda channel, event: published.append((channel, event)),
+    )
+    monkeypatch.setattr(broker, 'has_subscribers', lambda channel: True)
+    with django_capture_on_commit_callbacks(execute=True):
+        user_client.post(f'/posts/{post.id}/comment/', data={'text': 'Новый'})
+    assert not published, (
+        "Убедитесь, что непроверенный комментарий не рассылается читателям."
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        process_comment_scores(10)
+    assert [channel for channel, _ in published] == [post.id], (
+        "Убедитесь, что комментарий рассылается после одобрения."
+    )
+
+
+@pytest.mark.django_db
+def test_moderator_decision_not_overwritten(
+        post_with_published_location, user
+):
+    post = post_with_published_location
+    comment = make_comment(post, user, 'http://a.ru ' * 3)
+    Comment.objects.filter(pk=comment.pk).update(
+        status=CommentStatus.APPROVED
+    )
+    process_comment_scores(10)
+    comment.refresh_from_db()
+    assert comment.status == CommentStatus.APPROVED
+
+
+@pytest.mark.django_db
+def test_admin_actions(admin_client, post_with_published_location, user):
+    post = post_with_published_location
+    comments = [
+        make_comment(post, user, f'Комментарий {number}')
+        for number in range(2)
+    ]
+    Comment.objects.update(status=CommentStatus.PENDING, spam_score=1.5)
+    post.comment_count = 0
+    post.save(update_fields=['comment_count'])
+    response = admin_client.get(
+        '/admin/blog/comment/', {'status__exact': CommentStatus.PENDING}
+    )
+    assert response.status_code == 200
+    assert len(response.context['cl'].result_list) == 2, (
+        "Убедитесь, что в админке есть фильтр комментариев на модерации."
+    )
+    response = admin_client.post('/admin/blog/comment/', {
+        'action': 'approve_comments',
+        '_selected_action': [comment.pk for comment in comments],
+    })
+    assert response.status_code == 302
+    post.refresh_from_db()
+    assert post.comment_count == 2
+    admin_client.post('/admin/blog/comment/', {
+        'action': 'reject_comments',
+        '_selected_action': [comments[0].pk],
+    })
+    post.refresh_from_db()
+    assert post.comment_count == 1
+    assert Comment.objects.get(pk=comments[0].pk).status == (
+        CommentStatus.REJECTED
+    )
+    Comment.objects.get(pk=comments[0].pk).delete()
+    post.refresh_from_db()
+    assert post.comment_count == 1, (
+        "Убедитесь, что удаление скрытого комментария не меняет счётчик."
+    )
+
+
+@pytest.mark.django_db
+def test_score_comments_command(post_with_published_location, user):
+    make_comment(post_with_published_location, user, 'Текст')
+    call_command('score_comments', '--once')
+    assert not Comment.objects.filter(status=CommentStatus.NEW).exists()
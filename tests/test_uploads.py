@@ -0,0 +1,117 @@
+from io import BytesIO
+
+import pytest
+from blog.forms import ImageHeaderField
+from blog.models import Post
+from blog.uploads import LimitedUploadHandler
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import SkipFile
+from django.test import RequestFactory
+from PIL import Image
+
+
+def make_upload(size, name='photo.png'):
+    image_io = BytesIO()
+    Image.new('RGB', size).save(image_io, 'PNG')
+    return SimpleUploadedFile(name, image_io.getvalue(), 'image/png')
+
+
+def post_form_data(category):
+    return {
+        'title': 'Заголовок',
+        'text': 'Текст',
+        'pub_date': '2020-01-01T00:00',
+        'category': category.id,
+    }
+
+
+def test_handler_stops_over_limit(settings):
+    settings.MAX_UPLOAD_SIZE = 10
+    request = RequestFactory().post('/')
+    handler = LimitedUploadHandler(request)
+    handler.new_file('image', 'photo.png', 'image/png', None)
+    handler.receive_data_chunk(b'x' * 8, 0)
+    with pytest.raises(SkipFile):
+        handler.receive_data_chunk(b'x' * 8, 8)
+    assert len(handler.file.read()) <= settings.MAX_UPLOAD_SIZE, (
+        "Убедитесь, что данные сверх лимита не записываются на диск."
+    )
+    [(field_name, rejected)] = request.rejected_uploads
+    assert field_name == 'image' and rejected.size == 16, (
+        "Убедитесь, что отброшенная загрузка отмечается в запросе."
+    )
+
+
+@pytest.mark.django_db
+def test_oversized_upload_rejected(
+        settings, user_client, published_category
+):
+    settings.MAX_UPLOAD_SIZE = 64
+    response = user_client.post('/posts/create/', data={
+        **post_form_data(published_category),
+        'image': make_upload((50, 50)),
+    })
+    assert 'image' in response.context['form'].errors, (
+        "Убедитесь, что форма поста отклоняет файлы больше MAX_UPLOAD_SIZE."
+    )
+    assert 'Размер файла' in response.context['form'].errors['image'][0]
+    assert not Post.objects.exists()
+
+
+@pytest.mark.django_db
+def test_too_many_pixels_rejected(settings, user_client, published_category):
+    settings.MAX_IMAGE_PIXELS = 100
+    response = user_client.post('/posts/create/', data={
+        **post_form_data(published_category),
+        'image': make_upload((20, 20)),
+    })
+    assert 'image' in response.context['form'].errors, (
+        "Убедитесь, что форма поста отклоняет фото больше MAX_IMAGE_PIXELS"
+        " пикселей."
+    )
+
+
+@pytest.mark.django_db
+def test_valid_upload_accepted(user, user_client, published_category):
+    response = user_client.post('/posts/create/', data={
+        **post_form_data(published_category),
+        'image': make_upload((20, 20)),
+    })
+    assert response.status_code == 302
+    assert user.posts.get().image, (
+        "Убедитесь, что фото в пределах лимитов сохраняется."
+    )
+
+
+@pytest.mark.django_db
+def test_admin_upload_checked(
+        settings, admin_client, user, published_category
+):
+    settings.MAX_IMAGE_PIXELS = 100
+    response = admin_client.post('/admin/blog/post/add/', data={
+        **post_form_data(published_category),
+        'pub_date_0': '2020-01-01', 'pub_date_1': '00:00',
+        'author': user.id, 'is_published': 'on',
+        'image': make_upload((20, 20)),
+    })
+    assert response.status_code == 200
+    assert 'image' in response.context['adminform'].form.errors, (
+        "Убедитесь, что админка проверяет число пикселей фото."
+    )
+    assert not Post.objects.exists()
+
+
+def test_image_header_closed(monkeypatch):
+    opened = []
+    original_open = Image.open
+
+    def open_image(*args, **kwargs):
+        opened.append(original_open(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(Image, 'open', open_image)
+    upload = make_upload((20, 20))
+    assert ImageHeaderField().clean(upload).content_type == 'image/png'
+    assert opened and all(image.fp is None for image in opened), (
+        "Убедитесь, что файл фото закрывается после чтения заголовка."
+    )